@@ -0,0 +1,338 @@
+"""Offline end-to-end load test of the helpdesk chat loop.
+
+Replays scripted conversations (``benchmarks/conversations.jsonl``, one JSON
+conversation per line) against the HelpdeskAgent at increasing concurrency and
+reports, per concurrency level:
+  - throughput in turns and conversations per second
+  - p50/p95/p99 latency of every turn stage: first completion, time to first
+    token, tool calls, follow-up completion and the whole turn
+  - the share of turn time spent in each stage, to point at the bottleneck
+
+Nothing leaves the machine. OpenAI is replaced by chat.mock_openai, which answers
+every user message of the conversations file with its scripted reply or tool calls
+after ``--openai-latency``. Tickets go to a temporary SQLite database through the
+real outbox and notification dispatcher, and the notifications go to
+telegram_handler.stub_server. ``get_answer`` searches the CSV by word overlap
+after ``--kb-latency``, or the real knowledge base with ``--real-kb``. The mock
+servers run in this process and share its CPU with the agent.
+
+A conversation line looks like:
+    {"id": "...", "turns": [{"user": "...", "tool_calls": [{"name": "...", "arguments": {...}}],
+                             "follow_up": "..."}, {"user": "...", "content": "..."}]}
+
+Run from the repository root:
+    python -m benchmarks.load_test --concurrency 1,8,32,128 --conversations 200
+    python -m benchmarks.load_test --via http --output load_test.json
+"""
+import argparse
+import asyncio
+import csv
+import itertools
+import json
+import logging
+import os
+import re
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+CONVERSATIONS_PATH = os.path.join(BENCHMARKS_DIR, "conversations.jsonl")
+CSV_PATH = os.path.join(os.path.dirname(BENCHMARKS_DIR), "data", "hooli_helpdesk.csv")
+
+STAGES = ("completion_ms", "time_to_first_token_ms", "tools_ms", "follow_up_ms", "total_ms", "turn_ms")
+
+
+def load_conversations(path: str) -> List[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def build_script(conversations: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """The mock OpenAI script: every user message mapped to its scripted reply"""
+    return {
+        turn["user"]: {key: value for key, value in turn.items() if key != "user"}
+        for conversation in conversations
+        for turn in conversation["turns"]
+    }
+
+
+def overlap_search(csv_file_path: str, latency: float) -> Callable[[str], Dict[str, Any]]:
+    """A stand-in for ChromaKnowledgeBase.search_knowledge: the CSV pair sharing the
+    most words with the question, after ``latency`` seconds"""
+    with open(csv_file_path, encoding="utf-8", newline="") as f:
+        rows = [(row["Question"], row["Answer"]) for row in csv.DictReader(f)]
+    terms = [set(re.findall(r"\w+", question.lower())) for question, _ in rows]
+
+    def search(question: str) -> Dict[str, Any]:
+        if latency:
+            time.sleep(latency)
+        query = set(re.findall(r"\w+", question.lower()))
+        scores = [len(query & candidate) / len(query | candidate) if query else 0.0 for candidate in terms]
+        best = max(range(len(rows)), key=scores.__getitem__)
+        return {"question": rows[best][0], "answer": rows[best][1], "score": scores[best]}
+
+    return search
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    if len(samples) < 2:
+        value = round(samples[0], 1) if samples else None
+        return {"p50_ms": value, "p95_ms": value, "p99_ms": value, "mean_ms": value}
+    quantiles = statistics.quantiles(samples, n=100, method="inclusive")
+    return {
+        "p50_ms": round(quantiles[49], 1),
+        "p95_ms": round(quantiles[94], 1),
+        "p99_ms": round(quantiles[98], 1),
+        "mean_ms": round(statistics.mean(samples), 1),
+    }
+
+
+class Recorder:
+    """Collects the ``done`` events of the turns of one concurrency level"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+        self.turns = 0
+        self.conversations = 0
+        self.tickets = 0
+        self.errors: List[str] = []
+        self._lock = threading.Lock()
+
+    def record(self, done: Dict[str, Any], turn_ms: float):
+        with self._lock:
+            self.turns += 1
+            self.tickets += len(done["tickets"])
+            for stage, ms in done["timings"].items():
+                self.samples[stage].append(ms)
+            self.samples["turn_ms"].append(turn_ms)
+
+    def finished(self):
+        with self._lock:
+            self.conversations += 1
+
+    def failed(self, error: Exception):
+        with self._lock:
+            self.errors.append(f"{type(error).__name__}: {error}")
+
+    def report(self, concurrency: int, elapsed: float) -> Dict[str, Any]:
+        total = sum(self.samples["total_ms"]) or 1.0
+        return {
+            "concurrency": concurrency,
+            "conversations": self.conversations,
+            "turns": self.turns,
+            "errors": len(self.errors),
+            "tickets": self.tickets,
+            "seconds": round(elapsed, 2),
+            "turns_per_second": round(self.turns / elapsed, 1),
+            "conversations_per_second": round(self.conversations / elapsed, 1),
+            "latency": {stage: percentiles(samples) for stage, samples in self.samples.items() if samples},
+            # Time to first token is part of the completion, the rest add up to the turn
+            "share_of_turn": {
+                stage: round(sum(self.samples[stage]) / total, 3)
+                for stage in ("completion_ms", "tools_ms", "follow_up_ms")
+            },
+        }
+
+
+def schedule(conversations: List[Dict[str, Any]], count: int, level: int) -> List[tuple]:
+    """(conversation id, conversation) pairs to replay, cycling through the file"""
+    return [
+        (f"c{level}-{number}-{conversation['id']}", conversation)
+        for number, conversation in zip(range(count), itertools.cycle(conversations))
+    ]
+
+
+async def run_level_in_process(make_agent: Callable[[], Any], plan: List[tuple], concurrency: int,
+                               recorder: Recorder):
+    """Replay the conversations with ``concurrency`` simulated users on one HelpdeskAgent"""
+    agent = make_agent()
+    queue = list(reversed(plan))
+
+    async def user():
+        while queue:
+            conversation_id, conversation = queue.pop()
+            try:
+                for turn in conversation["turns"]:
+                    start = time.perf_counter()
+                    done = await agent.chat(conversation_id, turn["user"])
+                    recorder.record(done, (time.perf_counter() - start) * 1000)
+                recorder.finished()
+            except Exception as e:
+                recorder.failed(e)
+
+    await asyncio.gather(*(user() for _ in range(concurrency)))
+
+
+def run_level_over_http(base_url: str, plan: List[tuple], concurrency: int, recorder: Recorder):
+    """Replay the conversations with ``concurrency`` client threads through the HTTP API"""
+    from chat.client import AgentClient
+
+    client = AgentClient(base_url, pool_size=concurrency)
+
+    def replay(item):
+        conversation_id, conversation = item
+        try:
+            for turn in conversation["turns"]:
+                start = time.perf_counter()
+                done = client.chat(conversation_id, turn["user"])
+                recorder.record(done, (time.perf_counter() - start) * 1000)
+            recorder.finished()
+        except Exception as e:
+            recorder.failed(e)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(replay, plan))
+
+
+def print_level(result: Dict[str, Any]):
+    print(
+        f"concurrency {result['concurrency']:>4}: {result['turns_per_second']:7.1f} turns/s "
+        f"{result['conversations_per_second']:6.1f} conversations/s, {result['errors']} errors"
+    )
+    for stage, stats in result["latency"].items():
+        print(
+            f"    {stage:<24} p50 {stats['p50_ms']:8.1f} ms  p95 {stats['p95_ms']:8.1f} ms  "
+            f"p99 {stats['p99_ms']:8.1f} ms"
+        )
+    share = ", ".join(f"{stage[:-3]} {value:.0%}" for stage, value in result["share_of_turn"].items())
+    print(f"    share of turn time: {share}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conversations-file", default=CONVERSATIONS_PATH, help="JSONL file of scripted conversations")
+    parser.add_argument("--concurrency", default="1,8,32,128", help="comma separated numbers of concurrent users")
+    parser.add_argument("--conversations", type=int, default=100, help="conversations replayed per concurrency level")
+    parser.add_argument("--via", choices=("agent", "http"), default="agent",
+                        help="call the HelpdeskAgent in process or through the HTTP API")
+    parser.add_argument("--openai-latency", type=float, default=0.3, help="mock OpenAI seconds to the first byte")
+    parser.add_argument("--chunk-delay", type=float, default=0.01, help="mock OpenAI seconds between streamed chunks")
+    parser.add_argument("--max-concurrency", type=int, default=16, help="OpenAI requests the agent has in flight")
+    parser.add_argument("--no-stream", action="store_true", help="request completions without streaming")
+    parser.add_argument("--completion-cache", action="store_true", help="replay repeated completions from the cache")
+    parser.add_argument("--kb-latency", type=float, default=0.02, help="seconds per stand-in knowledge base search")
+    parser.add_argument("--real-kb", action="store_true", help="search the ChromaDB knowledge base built from --csv")
+    parser.add_argument("--csv", default=CSV_PATH, help="knowledge base CSV")
+    parser.add_argument("--telegram-latency", type=float, default=0.05, help="seconds per stub Telegram request")
+    parser.add_argument("--digest-window", type=float, default=0.0, help="TELEGRAM_DIGEST_WINDOW of the dispatcher")
+    parser.add_argument("--drain-timeout", type=float, default=10.0,
+                        help="seconds to wait for the outbox to be delivered after the last level")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    # TelegramHandler reads its credentials from the environment
+    os.environ.setdefault("TELEGRAM_API_TOKEN", "load-test")
+    os.environ.setdefault("TELEGRAM_CHAT_ID", "load-test")
+
+    from openai import AsyncOpenAI
+
+    from chat.agent import HelpdeskAgent
+    from chat.completion_cache import CompletionCache
+    from chat.helpdesk import DEVELOPER_PROMPT, TOOL_STAGES, direct_answer, get_tools
+    from chat.mock_openai import MockOpenAIServer
+    from chat.tools import ToolDispatcher
+    from telegram_handler.dispatcher import NotificationDispatcher
+    from telegram_handler.main import TelegramHandler
+    from telegram_handler.stub_server import TelegramStubServer
+    from ticket_db.main import TicketDB
+
+    conversations = load_conversations(args.conversations_file)
+    turns = sum(len(conversation["turns"]) for conversation in conversations)
+    print(f"{len(conversations)} conversations ({turns} turns) from {args.conversations_file}")
+
+    openai_mock = MockOpenAIServer(latency=args.openai_latency, chunk_delay=args.chunk_delay,
+                                   script=build_script(conversations)).start()
+    telegram_stub = TelegramStubServer(latency=args.telegram_latency).start()
+    results: Dict[str, Any] = {
+        "via": args.via,
+        "python": sys.version.split()[0],
+        "settings": {key: value for key, value in vars(args).items() if key != "output"},
+        "levels": [],
+    }
+
+    with tempfile.TemporaryDirectory() as directory:
+        ticket_db = TicketDB(os.path.join(directory, "tickets.db"))
+        notifications = NotificationDispatcher(
+            ticket_db, telegram_handler=TelegramHandler(base_url=telegram_stub.url),
+            digest_window=args.digest_window,
+        ).start()
+
+        if args.real_kb:
+            from chroma.main import get_knowledge_base
+
+            search = get_knowledge_base(args.csv, db_path=os.path.join(directory, "chroma"), sync=True).search_knowledge
+        else:
+            search = overlap_search(args.csv, args.kb_latency)
+
+        def create_ticket(question: str, level: str, person: str) -> dict:
+            ticket = TicketDB(ticket_db.db_path).add_ticket({'question': question, 'level': level, 'person': person})
+            notifications.wake()
+            return ticket
+
+        tool_dispatcher = ToolDispatcher(
+            {'get_answer': search, 'create_ticket': create_ticket},
+            formatters={'get_answer': lambda result: str(result['answer'])},
+        )
+
+        def make_agent():
+            # A new agent per event loop, its semaphore and HTTP connections belong to the loop
+            return HelpdeskAgent(
+                client=AsyncOpenAI(api_key="load-test", base_url=openai_mock.url),
+                tools=get_tools(),
+                tool_dispatcher=tool_dispatcher,
+                system_prompt=DEVELOPER_PROMPT,
+                completion_cache=CompletionCache() if args.completion_cache else None,
+                stream=not args.no_stream,
+                max_concurrency=args.max_concurrency,
+                tool_stages=TOOL_STAGES,
+                direct_answer=direct_answer,
+            )
+
+        base_url = None
+        if args.via == "http":
+            from chat.server import create_app, start_embedded_server
+
+            base_url = start_embedded_server(app=create_app(make_agent(), db_path=ticket_db.db_path))
+
+        for level in [int(value) for value in args.concurrency.split(",")]:
+            plan = schedule(conversations, args.conversations, level)
+            recorder = Recorder()
+            start = time.perf_counter()
+            if args.via == "http":
+                run_level_over_http(base_url, plan, level, recorder)
+            else:
+                asyncio.run(run_level_in_process(make_agent, plan, level, recorder))
+            result = recorder.report(level, time.perf_counter() - start)
+            if recorder.errors:
+                result["first_error"] = recorder.errors[0]
+            results["levels"].append(result)
+            print_level(result)
+
+        # Notifications are delivered in the background, rate limited per Telegram chat
+        deadline = time.monotonic() + args.drain_timeout
+        while ticket_db.get_outbox_stats().get("pending") and time.monotonic() < deadline:
+            time.sleep(0.2)
+        notifications.stop()
+        results["notifications"] = {
+            "outbox": ticket_db.get_outbox_stats(),
+            "telegram_messages": len(telegram_stub.messages),
+        }
+        print(f"notifications: {results['notifications']}")
+
+    openai_mock.stop()
+    telegram_stub.stop()
+    results["openai_requests"] = len(openai_mock.requests)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
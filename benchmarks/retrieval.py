@@ -0,0 +1,207 @@
+"""Offline retrieval benchmark for ChromaKnowledgeBase.
+
+Measures, for every retrieval backend / hybrid setting:
+  - seeding throughput from the helpdesk CSV and synthetic scaled-up copies of it
+  - p50/p95/p99 single-query latency (query caches disabled)
+  - batched search throughput for several batch sizes
+  - memory footprint of the retrieval backend and the process peak RSS
+  - recall@k and MRR on a paraphrase set derived from the CSV questions
+
+Nothing is sent to OpenAI and the MiniLM model is loaded from the local Hugging Face
+cache (pass --allow-download the first time). The knowledge bases are built in a
+temporary directory, chroma_data is never touched.
+
+Run from the repository root:
+    python -m benchmarks.retrieval --scales 1,10 --backends chroma,numpy,int8 --output retrieval.json
+"""
+import argparse
+import json
+import os
+import re
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+CSV_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "hooli_helpdesk.csv")
+
+# (pattern, replacement) rewrites turning a KB question into a paraphrase of it
+PARAPHRASE_RULES = [
+    (r"^How do I (.+?)\??$", r"what's the way to \1"),
+    (r"^How to (.+?)\??$", r"steps to \1"),
+    (r"^How can I (.+?)\??$", r"I need to \1"),
+    (r"^Why is my (.+?)\??$", r"my \1, why?"),
+    (r"^Why (.+?)\??$", r"reason \1"),
+    (r"^What(?:'s| is) (.+?)\??$", r"tell me \1"),
+    (r"^Can I (.+?)\??$", r"is it allowed to \1"),
+]
+
+
+def paraphrase(question: str) -> List[str]:
+    """Deterministic paraphrases of a KB question: a rule-based rewrite and a
+    lowercased keyword-only variant"""
+    variants = []
+    for pattern, replacement in PARAPHRASE_RULES:
+        if re.match(pattern, question, flags=re.IGNORECASE):
+            variants.append(re.sub(pattern, replacement, question, flags=re.IGNORECASE))
+            break
+    keywords = [word for word in re.findall(r"[\w'-]+", question.lower()) if len(word) > 3]
+    if keywords:
+        variants.append(" ".join(keywords))
+    return [variant for variant in variants if variant.lower() != question.lower()]
+
+
+def build_paraphrase_set(csv_file_path: str) -> List[Tuple[str, str]]:
+    """(paraphrased query, id of the Q&A pair it should retrieve)"""
+    import pandas as pd
+    from chroma.main import question_id
+
+    df = pd.read_csv(csv_file_path)
+    return [(query, question_id(question)) for question in df['Question'] for query in paraphrase(question)]
+
+
+def write_scaled_csv(csv_file_path: str, scale: int, directory: str) -> str:
+    """Copy of the CSV with ``scale`` variants of every Q&A pair"""
+    import pandas as pd
+
+    df = pd.read_csv(csv_file_path)
+    if scale == 1:
+        return csv_file_path
+    copies = [df] + [
+        df.assign(Question=df['Question'] + f" (variant {i})", Answer=df['Answer'] + f" [{i}]")
+        for i in range(1, scale)
+    ]
+    path = os.path.join(directory, f"helpdesk_x{scale}.csv")
+    pd.concat(copies).to_csv(path, index=False)
+    return path
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    quantiles = statistics.quantiles(samples, n=100, method="inclusive")
+    return {
+        "p50_ms": round(quantiles[49] * 1000, 3),
+        "p95_ms": round(quantiles[94] * 1000, 3),
+        "p99_ms": round(quantiles[98] * 1000, 3),
+        "mean_ms": round(statistics.mean(samples) * 1000, 3),
+    }
+
+
+def bench_seeding(csv_file_path: str, scales: List[int], directory: str) -> List[Dict]:
+    from chroma.main import ChromaKnowledgeBase
+
+    results = []
+    for scale in scales:
+        path = write_scaled_csv(csv_file_path, scale, directory)
+        kb = ChromaKnowledgeBase(db_path=os.path.join(directory, f"seed_x{scale}"), cache_size=0)
+        start = time.perf_counter()
+        stats = kb.sync_from_csv(path)
+        elapsed = time.perf_counter() - start
+        start = time.perf_counter()
+        kb.sync_from_csv(path)
+        resync = time.perf_counter() - start
+        results.append({
+            "scale": scale,
+            "rows": stats["added"],
+            "seconds": round(elapsed, 3),
+            "rows_per_second": round(stats["added"] / elapsed, 1),
+            "unchanged_resync_seconds": round(resync, 3),
+        })
+        print(f"seed x{scale}: {stats['added']} rows in {elapsed:.2f}s, unchanged re-sync {resync:.2f}s")
+    return results
+
+
+def bench_search(csv_file_path: str, db_path: str, backend: str, hybrid: bool,
+                 queries: List[Tuple[str, str]], k: int, batch_sizes: List[int]) -> Dict:
+    from chroma.main import ChromaKnowledgeBase
+
+    kb = ChromaKnowledgeBase(db_path=db_path, cache_size=0, backend=backend, hybrid=hybrid)
+    kb.initialize_database(csv_file_path)
+    texts = [query for query, _ in queries]
+
+    # Warm up the model and the index
+    kb.search_hits(texts[:8], k)
+
+    latencies = []
+    ranks = []
+    for query, expected_id in queries:
+        start = time.perf_counter()
+        hits = kb.search_hits([query], k)[0]
+        latencies.append(time.perf_counter() - start)
+        ids = [hit['id'] for hit in hits]
+        ranks.append(ids.index(expected_id) + 1 if expected_id in ids else None)
+
+    throughput = {}
+    for batch_size in batch_sizes:
+        batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+        start = time.perf_counter()
+        for batch in batches:
+            kb.search_knowledge_batch(batch, k)
+        throughput[str(batch_size)] = round(len(texts) / (time.perf_counter() - start), 1)
+
+    result = {
+        "backend": backend,
+        "hybrid": hybrid,
+        "queries": len(queries),
+        "latency": percentiles(latencies),
+        "batch_queries_per_second": throughput,
+        f"recall@{k}": round(sum(rank is not None for rank in ranks) / len(ranks), 4),
+        "recall@1": round(sum(rank == 1 for rank in ranks) / len(ranks), 4),
+        "mrr": round(sum(1 / rank for rank in ranks if rank) / len(ranks), 4),
+        "memory": kb.get_backend().memory_footprint(),
+    }
+    if hasattr(kb.get_backend(), "evaluate_recall"):
+        result["quantization_recall"] = kb.backend_report(texts, k)
+    print(
+        f"{backend:<7} hybrid={str(hybrid):<5} p50 {result['latency']['p50_ms']:.2f} ms "
+        f"p99 {result['latency']['p99_ms']:.2f} ms recall@1 {result['recall@1']:.3f} "
+        f"recall@{k} {result[f'recall@{k}']:.3f} batch qps {throughput}"
+    )
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", default=CSV_PATH, help="knowledge base CSV")
+    parser.add_argument("--scales", default="1,10", help="comma separated CSV scale factors for seeding")
+    parser.add_argument("--backends", default="chroma,numpy,int8,binary", help="comma separated retrieval backends")
+    parser.add_argument("--batch-sizes", default="1,8,32,128", help="comma separated batch sizes")
+    parser.add_argument("-k", type=int, default=3, help="number of results per query")
+    parser.add_argument("--allow-download", action="store_true", help="allow downloading the embedding model")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    if not args.allow_download:
+        os.environ.setdefault("HF_HUB_OFFLINE", "1")
+        os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+
+    queries = build_paraphrase_set(args.csv)
+    print(f"{len(queries)} paraphrased queries derived from {args.csv}")
+    results = {
+        "csv": args.csv,
+        "k": args.k,
+        "python": sys.version.split()[0],
+        "seeding": [],
+        "search": [],
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        results["seeding"] = bench_seeding(args.csv, [int(scale) for scale in args.scales.split(",")], directory)
+        db_path = os.path.join(directory, "search")
+        for backend in args.backends.split(","):
+            for hybrid in (False, True):
+                results["search"].append(bench_search(
+                    args.csv, db_path, backend, hybrid, queries, args.k,
+                    [int(size) for size in args.batch_sizes.split(",")],
+                ))
+    # ru_maxrss is in kilobytes on Linux
+    results["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
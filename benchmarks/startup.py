@@ -0,0 +1,90 @@
+"""Cold-start benchmark for the Streamlit app.
+
+Every measurement runs in a fresh interpreter: the import time of the app modules
+and the time until the first render of main.py has finished (through Streamlit's
+AppTest, no browser needed). Medians are compared with startup_budget.json and the
+script exits with status 1 when a budget is exceeded.
+
+Run from the repository root:
+    python -m benchmarks.startup --runs 5 --output startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "startup_budget.json")
+
+IMPORT_SNIPPET = """
+import time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+"""
+
+RENDER_SNIPPET = """
+import time
+from streamlit.testing.v1 import AppTest
+start = time.perf_counter()
+app = AppTest.from_file("main.py", default_timeout=120).run()
+elapsed = time.perf_counter() - start
+if app.exception:
+    raise SystemExit(f"main.py raised during the first render: {app.exception[0].message}")
+print(elapsed)
+"""
+
+# The first render must not need real credentials
+DUMMY_ENV = {
+    "OPENAI_API_KEY": "sk-benchmark",
+    "TELEGRAM_API_TOKEN": "benchmark",
+    "TELEGRAM_CHAT_ID": "benchmark",
+    "CSV_KNOWLEDGE_BASE_PATH": "./data/hooli_helpdesk.csv",
+}
+
+
+def run_snippet(snippet: str) -> float:
+    env = {**DUMMY_ENV, **os.environ}
+    result = subprocess.run(
+        [sys.executable, "-c", snippet], cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip() or result.stdout.strip())
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per measurement")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    with open(BUDGET_PATH, encoding="utf-8") as f:
+        budget = json.load(f)
+
+    results = {"import_seconds": {}, "first_render_seconds": None, "violations": []}
+    for module, limit in budget["import_seconds"].items():
+        median = statistics.median(run_snippet(IMPORT_SNIPPET.format(module=module)) for _ in range(args.runs))
+        results["import_seconds"][module] = round(median, 4)
+        print(f"import {module:<24} {median * 1000:8.1f} ms (budget {limit * 1000:.0f} ms)")
+        if median > limit:
+            results["violations"].append(f"import {module}: {median:.3f}s > {limit}s")
+
+    median = statistics.median(run_snippet(RENDER_SNIPPET) for _ in range(args.runs))
+    results["first_render_seconds"] = round(median, 4)
+    print(f"first render of main.py       {median * 1000:8.1f} ms (budget {budget['first_render_seconds'] * 1000:.0f} ms)")
+    if median > budget["first_render_seconds"]:
+        results["violations"].append(f"first render: {median:.3f}s > {budget['first_render_seconds']}s")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    for violation in results["violations"]:
+        print(f"BUDGET EXCEEDED: {violation}")
+    sys.exit(1 if results["violations"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Ticket insert throughput: per-row commits versus group commit.
+
+  per-row       every thread calls TicketDB.add_ticket, one transaction per ticket
+  group-commit  the same threads with write_behind=True, the background writer
+                commits queued tickets together with executemany
+  bulk          TicketDB.add_tickets in chunks, as used for imports
+
+Run from the repository root:
+    python -m benchmarks.ticket_insert --threads 16 --tickets 200
+"""
+import argparse
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from ticket_db.main import TicketDB, get_writer
+
+SAMPLE = {'question': 'Need help with printer setup', 'level': 'MEDIUM', 'person': 'John Doe'}
+
+
+def threaded(db_path: str, threads: int, tickets: int, write_behind: bool) -> float:
+    def worker():
+        ticket_db = TicketDB(db_path, write_behind=write_behind)
+        for _ in range(tickets):
+            ticket_db.add_ticket(SAMPLE)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return threads * tickets / (time.perf_counter() - start)
+
+
+def bulk(db_path: str, total: int, chunk_size: int) -> float:
+    ticket_db = TicketDB(db_path)
+    start = time.perf_counter()
+    for offset in range(0, total, chunk_size):
+        ticket_db.add_tickets([SAMPLE] * min(chunk_size, total - offset))
+    return total / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--tickets", type=int, default=200, help="tickets per thread")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="tickets per add_tickets call in bulk mode")
+    parser.add_argument("--max-batch", type=int, default=100, help="group commit size limit")
+    parser.add_argument("--flush-interval", type=float, default=0.0, help="group commit wait in seconds")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as directory:
+        per_row = threaded(os.path.join(directory, "per_row.db"), args.threads, args.tickets, write_behind=False)
+        print(f"per-row commit: {per_row:10.1f} tickets/s")
+
+        group_path = os.path.join(directory, "group.db")
+        TicketDB(group_path)
+        get_writer(group_path, flush_interval=args.flush_interval, max_batch=args.max_batch)
+        group = threaded(group_path, args.threads, args.tickets, write_behind=True)
+        print(f"group commit:   {group:10.1f} tickets/s ({group / per_row:.1f}x)")
+
+        total = args.threads * args.tickets
+        bulk_rate = bulk(os.path.join(directory, "bulk.db"), total, args.chunk_size)
+        print(f"bulk insert:    {bulk_rate:10.1f} tickets/s ({bulk_rate / per_row:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Multi-threaded ticket creation stress test.
+
+Several threads create tickets concurrently, first through the previous code path
+(a new connection per call and the name computed from a separate MAX(id) read,
+reproduced here) and then through TicketDB.add_ticket. For each it reports the
+throughput and how many ticket names were handed out more than once.
+
+Run from the repository root:
+    python -m benchmarks.ticket_stress --threads 8 --tickets 200
+"""
+import argparse
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, List
+
+from ticket_db.main import TicketDB
+
+SAMPLE = {'question': 'Need help with printer setup', 'level': 'MEDIUM', 'person': 'John Doe'}
+
+
+def legacy_add_ticket(db_path: str) -> str:
+    """The pre-transactional code path: three connections per ticket"""
+    with sqlite3.connect(db_path) as conn:
+        latest = conn.execute('SELECT MAX(id) FROM tickets').fetchone()[0] or 0
+    name = f"HOOLI-{latest + 1}"
+    with sqlite3.connect(db_path, timeout=30) as conn:
+        latest = conn.execute('SELECT MAX(id) FROM tickets').fetchone()[0] or 0
+        conn.execute(
+            'INSERT INTO tickets (ticket_name, question, level, person) VALUES (?, ?, ?, ?)',
+            (f"HOOLI-{latest + 1}", SAMPLE['question'], SAMPLE['level'], SAMPLE['person']),
+        )
+    return name
+
+
+def run(create: Callable[[], str], threads: int, tickets: int) -> Dict:
+    names: List[str] = []
+    errors: List[str] = []
+    lock = threading.Lock()
+
+    def worker():
+        for _ in range(tickets):
+            try:
+                name = create()
+            except sqlite3.Error as e:
+                with lock:
+                    errors.append(str(e))
+                continue
+            with lock:
+                names.append(name)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    duplicates = sum(count - 1 for count in Counter(names).values() if count > 1)
+    return {
+        "created": len(names),
+        "errors": len(errors),
+        "duplicate_names": duplicates,
+        "tickets_per_second": round(len(names) / elapsed, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--tickets", type=int, default=200, help="tickets per thread")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as directory:
+        legacy_path = os.path.join(directory, "legacy.db")
+        with sqlite3.connect(legacy_path) as conn:
+            conn.execute('''
+                CREATE TABLE tickets (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    ticket_name TEXT,
+                    question TEXT,
+                    level TEXT CHECK(level IN ('LOW', 'MEDIUM', 'HIGH')),
+                    person TEXT
+                )
+            ''')
+        legacy = run(lambda: legacy_add_ticket(legacy_path), args.threads, args.tickets)
+        print(f"legacy:      {legacy}")
+
+        db_path = os.path.join(directory, "tickets.db")
+        TicketDB(db_path)
+        current = run(lambda: TicketDB(db_path).add_ticket(SAMPLE)['ticket_name'], args.threads, args.tickets)
+        print(f"transaction: {current}")
+
+        stored = TicketDB(db_path).get_all_tickets()
+        assert current["duplicate_names"] == 0, "add_ticket handed out duplicate ticket names"
+        assert len({ticket['ticket_name'] for ticket in stored}) == len(stored) == current["created"]
+        print(f"speedup: {current['tickets_per_second'] / legacy['tickets_per_second']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+import asyncio
+import logging
+import sys
+import time
+
+from chat.context import ContextWindow, facts_from_tool_call, remember_facts
+from chat.main import AsyncStreamedCompletion
+from chat.tools import ToolDispatcher
+
+
+class Conversation:
+    """History and remembered facts of one conversation; its turns run one at a time"""
+
+    def __init__(self):
+        self.messages: List[Dict[str, Any]] = []
+        self.facts: "OrderedDict[str, str]" = OrderedDict()
+        self.lock = asyncio.Lock()
+
+
+class HelpdeskAgent:
+    """The chat turn loop: prompt, tool dispatch and follow-up completion.
+
+    One agent serves many conversations concurrently from a single event loop.
+    Completions go through an ``AsyncOpenAI`` client with at most
+    ``max_concurrency`` requests in flight; blocking tool calls (Chroma, SQLite)
+    run on worker threads. Conversations are kept in memory by id, the least
+    recently used are dropped beyond ``max_conversations``.
+    """
+
+    def __init__(self, client, tools: List[Dict[str, Any]], tool_dispatcher: ToolDispatcher, system_prompt: str,
+                 context_window: Optional[ContextWindow] = None, completion_cache=None,
+                 model: str = "gpt-4o-mini", stream: bool = True, max_concurrency: int = 16,
+                 tool_stages: Optional[Dict[str, str]] = None,
+                 direct_answer: Optional[Callable[[List[Dict[str, Any]]], Optional[str]]] = None,
+                 max_conversations: int = 10000):
+        logging.basicConfig(
+            level=logging.INFO,
+            format='[%(levelname)s - %(asctime)s] %(message)s',
+            handlers=[logging.StreamHandler(sys.stdout)]
+        )
+        self.logger = logging.getLogger()
+        self.client = client
+        self.tools = tools
+        self.tool_dispatcher = tool_dispatcher
+        self.system_prompt = system_prompt
+        self.context_window = context_window or ContextWindow()
+        self.completion_cache = completion_cache
+        self.model = model
+        self.stream = stream
+        self.max_concurrency = max_concurrency
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.tool_stages = tool_stages or {}
+        self.direct_answer = direct_answer
+        self.max_conversations = max_conversations
+        self.conversations: "OrderedDict[str, Conversation]" = OrderedDict()
+        self.turns_in_progress = 0
+
+    def conversation(self, conversation_id: str) -> Conversation:
+        conversation = self.conversations.get(conversation_id)
+        if conversation is None:
+            conversation = self.conversations[conversation_id] = Conversation()
+            while len(self.conversations) > self.max_conversations:
+                self.conversations.popitem(last=False)
+        self.conversations.move_to_end(conversation_id)
+        return conversation
+
+    def completion(self, messages: List[Dict[str, Any]]) -> AsyncStreamedCompletion:
+        return AsyncStreamedCompletion(
+            self.client,
+            stream=self.stream,
+            cache=self.completion_cache,
+            semaphore=self.semaphore,
+            model=self.model,
+            temperature=0,
+            tools=self.tools,
+            messages=messages,
+        )
+
+    async def turn(self, conversation_id: str, content: str) -> AsyncIterator[Dict[str, Any]]:
+        """Answer a user message, yielding events as the turn progresses:
+
+        - ``{"type": "stage", "label": ...}`` when the turn enters a new stage
+        - ``{"type": "token", "text": ...}`` for every piece of the reply
+        - ``{"type": "done", ...}`` at the end, with the full ``reply``, the
+          ``tool_calls`` made, the ``tickets`` created, ``prompt_tokens`` and the
+          per-stage ``timings`` in milliseconds
+        """
+        conversation = self.conversation(conversation_id)
+        async with conversation.lock:
+            self.turns_in_progress += 1
+            try:
+                async for event in self._turn(conversation_id, conversation, content):
+                    yield event
+            finally:
+                self.turns_in_progress -= 1
+
+    async def _turn(self, conversation_id: str, conversation: Conversation,
+                    content: str) -> AsyncIterator[Dict[str, Any]]:
+        start = time.perf_counter()
+        timings: Dict[str, float] = {}
+        # Kept in the history only once the turn has a reply, a failed turn leaves no unanswered message
+        user_message = {"role": "user", "content": content}
+        prompt_messages, context_report = self.context_window.build(
+            [{"role": "developer", "content": self.system_prompt}, *conversation.messages, user_message], conversation.facts
+        )
+        self.logger.info(
+            f"Prompt tokens: {context_report['prompt_tokens']} (full history {context_report['history_tokens']}, "
+            f"{context_report['summarized_messages']} messages summarized)"
+        )
+        prompt_messages = [{"role": m["role"], "content": m["content"]} for m in prompt_messages]
+
+        yield {"type": "stage", "label": "Generating..."}
+        completion = self.completion(prompt_messages)
+        async for text in completion:
+            yield {"type": "token", "text": text}
+        timings["completion_ms"] = completion.duration * 1000
+        if completion.time_to_first_token is not None:
+            timings["time_to_first_token_ms"] = completion.time_to_first_token * 1000
+        reply = completion.content
+        tool_calls = completion.tool_calls
+        names = [tool_call["function"]["name"] for tool_call in tool_calls]
+        tickets = []
+
+        if tool_calls:
+            self.logger.info(f"Processing tool calls: {', '.join(names)}")
+            stages = [self.tool_stages.get(name, f"running {name}") for name in dict.fromkeys(names)]
+            yield {"type": "stage", "label": f"{' and '.join(stages).capitalize()}..."}
+            tools_start = time.perf_counter()
+            # All calls run at once on worker threads, e.g. a knowledge base search next to a ticket insert
+            outcomes = await asyncio.get_running_loop().run_in_executor(None, self.tool_dispatcher.dispatch, tool_calls)
+            timings["tools_ms"] = (time.perf_counter() - tools_start) * 1000
+            for outcome in outcomes:
+                if outcome["error"] is None:
+                    remember_facts(conversation.facts, facts_from_tool_call(outcome["name"], outcome["arguments"], outcome["result"]))
+                    if outcome["name"] == "create_ticket":
+                        tickets.append(outcome["result"])
+
+            reply = self.direct_answer(outcomes) if self.direct_answer is not None else None
+            if reply is not None:
+                yield {"type": "token", "text": reply}
+            else:
+                # One follow-up completion answers with the results of all calls
+                yield {"type": "stage", "label": "Generating answer..."}
+                follow_up = self.completion(self.tool_dispatcher.follow_up_messages(prompt_messages, tool_calls, outcomes))
+                async for text in follow_up:
+                    yield {"type": "token", "text": text}
+                timings["follow_up_ms"] = follow_up.duration * 1000
+                reply = follow_up.content
+
+        conversation.messages.extend([user_message, {"role": "assistant", "content": reply}])
+        timings["total_ms"] = (time.perf_counter() - start) * 1000
+        yield {
+            "type": "done",
+            "conversation_id": conversation_id,
+            "reply": reply,
+            "tool_calls": names,
+            "tickets": tickets,
+            "prompt_tokens": context_report["prompt_tokens"],
+            "timings": {stage: round(ms, 1) for stage, ms in timings.items()},
+        }
+
+    async def chat(self, conversation_id: str, content: str) -> Dict[str, Any]:
+        """Answer a user message and return the final ``done`` event of the turn"""
+        result: Dict[str, Any] = {}
+        async for event in self.turn(conversation_id, content):
+            if event["type"] == "done":
+                result = event
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {
+            "conversations": len(self.conversations),
+            "turns_in_progress": self.turns_in_progress,
+            "max_concurrency": self.max_concurrency,
+        }
+        if self.completion_cache is not None:
+            stats["completion_cache"] = self.completion_cache.stats()
+        return stats
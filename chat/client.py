@@ -0,0 +1,88 @@
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+import json
+import logging
+import sys
+
+
+class AgentClient:
+    """Client of the helpdesk agent API (``chat.server``).
+
+    ``get_tickets_page`` and ``get_tickets_since`` mirror ``TicketDB``, so a
+    ``TicketView`` can be built on top of the client.
+    """
+
+    def __init__(self, base_url: str, timeout: Union[float, Tuple[float, float]] = (3.05, 120.0), pool_size: int = 16):
+        logging.basicConfig(
+            level=logging.INFO,
+            format='[%(levelname)s - %(asctime)s] %(message)s',
+            handlers=[logging.StreamHandler(sys.stdout)]
+        )
+        self.logger = logging.getLogger()
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.session = requests.Session()
+        # One keep-alive connection per concurrent caller, e.g. Streamlit sessions
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+
+    def _get(self, path: str, **params) -> Any:
+        response = self.session.get(
+            f"{self.base_url}{path}",
+            params={key: value for key, value in params.items() if value is not None},
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def send_message(self, conversation_id: str, content: str) -> Iterator[Dict[str, Any]]:
+        """Send a user message and yield the events of the turn as they arrive"""
+        with self.session.post(
+            f"{self.base_url}/conversations/{conversation_id}/messages",
+            json={"content": content, "stream": True},
+            stream=True,
+            timeout=self.timeout,
+        ) as response:
+            response.raise_for_status()
+            for line in response.iter_lines(decode_unicode=True):
+                if line and line.startswith("data: "):
+                    event = json.loads(line[len("data: "):])
+                    if event["type"] == "error":
+                        raise RuntimeError(f"Agent turn failed: {event['message']}")
+                    yield event
+
+    def chat(self, conversation_id: str, content: str) -> Dict[str, Any]:
+        """Send a user message and return the final ``done`` event of the turn"""
+        response = self.session.post(
+            f"{self.base_url}/conversations/{conversation_id}/messages",
+            json={"content": content, "stream": False},
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def get_tickets_page(self, before_id: Optional[int] = None, limit: int = 50,
+                         level: Optional[str] = None, person: Optional[str] = None) -> List[Dict]:
+        return self._get("/tickets", before_id=before_id, limit=limit, level=level, person=person)
+
+    def get_tickets_since(self, last_id: int, limit: Optional[int] = None) -> List[Dict]:
+        return self._get("/tickets", after_id=last_id, limit=limit)
+
+    def get_stats(self) -> Dict:
+        return self._get("/tickets/stats")
+
+    def get_metrics(self) -> Dict:
+        return self._get("/metrics")
+
+
+if __name__ == "__main__":
+    # Talk to a running agent: python -m chat.server --port 8000
+    client = AgentClient("http://127.0.0.1:8000")
+    for event in client.send_message("example", "How do I reset my password?"):
+        if event["type"] == "token":
+            print(event["text"], end="", flush=True)
+        elif event["type"] == "done":
+            print()
+            print(event["timings"])
@@ -0,0 +1,211 @@
+import atexit
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from chroma.cache import LRUCache, normalize_query
+
+
+def canonical_messages(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Messages as sent, with the random tool call ids numbered in order of appearance.
+
+    Content and tool call arguments are kept verbatim: letter case, punctuation and
+    whitespace can change a completion, so only the semantic tier looks past them.
+    """
+    call_ids: Dict[str, str] = {}
+    canonical = []
+    for message in messages:
+        entry: Dict[str, Any] = {"role": message["role"]}
+        if message.get("content") is not None:
+            entry["content"] = message["content"]
+        if message.get("tool_calls"):
+            calls = []
+            for tool_call in message["tool_calls"]:
+                call_ids[tool_call["id"]] = f"call_{len(call_ids)}"
+                calls.append({"name": tool_call["function"]["name"], "arguments": tool_call["function"]["arguments"]})
+            entry["tool_calls"] = calls
+        if message.get("tool_call_id"):
+            entry["tool_call_id"] = call_ids.get(message["tool_call_id"], message["tool_call_id"])
+        canonical.append(entry)
+    return canonical
+
+
+def digest(value: Any) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class CompletionCache:
+    """Cache of chat completion responses, keyed on the request.
+
+    The exact tier keys on a hash of the model, temperature, tool schema and the
+    message list as sent (only tool call ids are renumbered). The optional semantic
+    tier (``embed`` given) matches the first turn of a conversation: when everything
+    but the user's question is identical, a question whose normalized text has an
+    embedding with cosine similarity of at least ``semantic_threshold`` with a cached
+    one reuses its response, so paraphrased opening questions skip OpenAI.
+
+    Only temperature 0 requests are cached, and never a turn that calls one of
+    ``uncacheable_tools``: neither the completion that asks for the call nor the
+    follow-up that reports its result, nor a completion cut off by the token limit
+    (``finish_reason`` ``length``). Entries expire after ``ttl`` seconds, the least
+    recently used go beyond ``max_size``, and ``persist_path`` keeps the cache
+    across restarts; changes are saved from a timer thread ``persist_interval``
+    seconds after they are made, and at exit.
+    """
+
+    def __init__(self, max_size: int = 1000, ttl: Optional[float] = 86400,
+                 persist_path: Optional[str] = None, persist_interval: float = 30.0,
+                 embed: Optional[Callable[[str], Sequence[float]]] = None, semantic_threshold: float = 0.95,
+                 uncacheable_tools: Sequence[str] = ("create_ticket",)):
+        self.logger = logging.getLogger()
+        self.exact = LRUCache(max_size, ttl)
+        self.semantic = LRUCache(max_size, ttl)
+        self.ttl = ttl
+        self.embed = embed
+        self.semantic_threshold = semantic_threshold
+        self.uncacheable_tools = set(uncacheable_tools)
+        self.persist_path = persist_path
+        self.persist_interval = persist_interval
+        self.counters = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "skipped": 0, "stored": 0}
+        self._counters_lock = threading.Lock()
+        self._dirty = False
+        self._save_timer: Optional[threading.Timer] = None
+        self._persist_lock = threading.Lock()
+        if persist_path:
+            self.load()
+            atexit.register(self.save)
+
+    def cacheable(self, request: Dict[str, Any]) -> bool:
+        if request.get("temperature") != 0:
+            return False
+        messages = request.get("messages", [])
+        last_user = max((i for i, message in enumerate(messages) if message["role"] == "user"), default=-1)
+        return not any(
+            tool_call["function"]["name"] in self.uncacheable_tools
+            for message in messages[last_user + 1:]
+            for tool_call in message.get("tool_calls") or []
+        )
+
+    def keys(self, request: Dict[str, Any]) -> Tuple[str, Optional[Tuple[str, str]]]:
+        """The exact key and, for a first turn, the (context key, question) of the semantic tier"""
+        messages = canonical_messages(request.get("messages", []))
+        settings = {"model": request.get("model"), "temperature": request.get("temperature"), "tools": request.get("tools")}
+        exact_key = digest({**settings, "messages": messages})
+        users = [i for i, message in enumerate(messages) if message["role"] == "user"]
+        conversation = [message for message in messages if message["role"] not in ("developer", "system")]
+        if len(users) != 1 or conversation[0]["role"] != "user":
+            return exact_key, None
+        # Everything but the question itself has to match
+        context = messages[:users[0]] + [{"role": "user"}] + messages[users[0] + 1:]
+        return exact_key, (digest({**settings, "messages": context}), normalize_query(messages[users[0]].get("content") or ""))
+
+    def get(self, request: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Cached response (``content``, ``tool_calls`` and ``finish_reason``) for the request, or None"""
+        if not self.cacheable(request):
+            self._count("skipped")
+            return None
+        exact_key, semantic = self.keys(request)
+        response = self.exact.get(exact_key)
+        if response is not None:
+            self._count("exact_hits")
+            return response
+        if semantic is not None and self.embed is not None:
+            response = self._semantic_get(*semantic)
+            if response is not None:
+                self._count("semantic_hits")
+                return response
+        self._count("misses")
+        return None
+
+    def put(self, request: Dict[str, Any], response: Dict[str, Any]):
+        if not self.cacheable(request) or response.get("finish_reason") == "length":
+            return
+        if any(tool_call["function"]["name"] in self.uncacheable_tools for tool_call in response.get("tool_calls") or []):
+            return
+        exact_key, semantic = self.keys(request)
+        self.exact.put(exact_key, response)
+        if semantic is not None and self.embed is not None:
+            context_key, question = semantic
+            embedding = [float(x) for x in self.embed(question)]
+            self.semantic.put(f"{context_key}:{digest(question)}",
+                              {"context": context_key, "embedding": embedding, "response": response})
+        self._count("stored")
+        self._mark_dirty()
+
+    def _semantic_get(self, context_key: str, question: str) -> Optional[Dict[str, Any]]:
+        import numpy as np
+
+        now = time.time()
+        candidates = [
+            (key, value) for key, created_at, value in self.semantic.items()
+            if value["context"] == context_key and (self.ttl is None or now - created_at <= self.ttl)
+        ]
+        if not candidates:
+            return None
+        query = np.asarray(self.embed(question), dtype=np.float32)
+        matrix = np.asarray([value["embedding"] for _, value in candidates], dtype=np.float32)
+        similarities = matrix @ query / (np.linalg.norm(matrix, axis=1) * np.linalg.norm(query) + 1e-12)
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.semantic_threshold:
+            return None
+        self.logger.info(f"Semantic completion cache hit (similarity {similarities[best]:.3f})")
+        # The TTL was checked above; a second lookup could miss an entry evicted meanwhile
+        return candidates[best][1]["response"]
+
+    def _count(self, counter: str):
+        with self._counters_lock:
+            self.counters[counter] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        counters = dict(self.counters)
+        lookups = counters["exact_hits"] + counters["semantic_hits"] + counters["misses"]
+        return {
+            **counters,
+            "hit_rate": round((counters["exact_hits"] + counters["semantic_hits"]) / lookups, 4) if lookups else 0.0,
+            "exact_entries": len(self.exact),
+            "semantic_entries": len(self.semantic),
+        }
+
+    def _mark_dirty(self):
+        """Schedule a save on a timer thread, so request threads never wait for the JSON dump"""
+        self._dirty = True
+        if not self.persist_path or self._save_timer is not None:
+            return
+        with self._persist_lock:
+            if self._save_timer is None:
+                self._save_timer = threading.Timer(self.persist_interval, self.save)
+                self._save_timer.daemon = True
+                self._save_timer.start()
+
+    def load(self):
+        if not self.persist_path or not os.path.exists(self.persist_path):
+            return
+        try:
+            with open(self.persist_path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Ignoring unreadable completion cache {self.persist_path}: {e}")
+            return
+        for key, created_at, value in data.get("exact", []):
+            self.exact.put(key, value, created_at)
+        for key, created_at, value in data.get("semantic", []):
+            self.semantic.put(key, value, created_at)
+        self.logger.info(f"Loaded completion cache from {self.persist_path}: {self.stats()}")
+
+    def save(self):
+        if not self.persist_path or not self._dirty:
+            return
+        with self._persist_lock:
+            # Changes made from here on schedule the next save
+            self._save_timer = None
+            self._dirty = False
+            data = {"exact": self.exact.items(), "semantic": self.semantic.items()}
+            os.makedirs(os.path.dirname(self.persist_path) or ".", exist_ok=True)
+            tmp_path = f"{self.persist_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.persist_path)
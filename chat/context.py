@@ -0,0 +1,184 @@
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+import re
+import sys
+
+# Tokens the Chat Completions API adds per message and to prime the reply
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+
+
+def first_sentence(text: str, max_words: int = 30) -> str:
+    """The first sentence of ``text``, cut to ``max_words`` words"""
+    text = re.sub(r"\s+", " ", text or "").strip()
+    sentence = re.split(r"(?<=[.!?])\s", text, maxsplit=1)[0]
+    words = sentence.split(" ")
+    if len(words) > max_words:
+        sentence = " ".join(words[:max_words]) + "…"
+    return sentence
+
+
+class ContextWindow:
+    """Keeps the prompt sent to OpenAI within a token budget.
+
+    The system/developer messages are always sent. Of the conversation, the most
+    recent messages that fit in ``max_tokens`` are sent as they are (at least the
+    last ``min_recent_messages``); older ones are folded into an extractive summary
+    (the first sentence of each turn, newest kept when the summary itself runs over
+    ``summary_tokens``). Facts taken from tool results, such as the user's name and
+    the tickets created, are pinned in the summary so they are never lost.
+
+    Tokens are counted with tiktoken when it is installed and estimated at four
+    characters per token otherwise.
+    """
+
+    def __init__(self, max_tokens: int = 2000, min_recent_messages: int = 2, summary_tokens: int = 300,
+                 model: str = "gpt-4o-mini"):
+        logging.basicConfig(
+            level=logging.INFO,
+            format='[%(levelname)s - %(asctime)s] %(message)s',
+            handlers=[logging.StreamHandler(sys.stdout)]
+        )
+        self.logger = logging.getLogger()
+        self.max_tokens = max_tokens
+        self.min_recent_messages = min_recent_messages
+        self.summary_tokens = summary_tokens
+        self.model = model
+        self._encoding = None
+        self._encoding_loaded = False
+
+    @property
+    def encoding(self):
+        """tiktoken encoding of the model, None when tiktoken is not available"""
+        if not self._encoding_loaded:
+            self._encoding_loaded = True
+            try:
+                import tiktoken
+
+                try:
+                    self._encoding = tiktoken.encoding_for_model(self.model)
+                except KeyError:
+                    self._encoding = tiktoken.get_encoding("o200k_base")
+            except Exception as e:
+                self.logger.info(f"tiktoken not available ({e}), estimating token counts")
+        return self._encoding
+
+    def count(self, text: Optional[str]) -> int:
+        if not text:
+            return 0
+        if self.encoding is not None:
+            return len(self.encoding.encode(text))
+        return max(1, len(text) // 4)
+
+    def message_tokens(self, message: Dict[str, Any]) -> int:
+        tokens = TOKENS_PER_MESSAGE + self.count(message.get("content"))
+        for tool_call in message.get("tool_calls") or []:
+            tokens += self.count(tool_call["function"]["name"]) + self.count(tool_call["function"]["arguments"])
+        return tokens
+
+    def prompt_tokens(self, messages: List[Dict[str, Any]]) -> int:
+        return sum(self.message_tokens(message) for message in messages) + TOKENS_PER_REPLY
+
+    def summarize(self, messages: List[Dict[str, Any]], facts: Optional[Dict[str, str]] = None) -> Optional[str]:
+        """Extractive summary of ``messages`` with the ``facts`` pinned on top"""
+        fact_lines = [f"- {key}: {value}" for key, value in (facts or {}).items()]
+        turn_lines = []
+        for message in messages:
+            if message["role"] == "user":
+                turn_lines.append(f"- User: {first_sentence(message['content'])}")
+            elif message["role"] == "assistant" and message.get("content"):
+                turn_lines.append(f"- Assistant: {first_sentence(message['content'])}")
+        # Drop the oldest turns first, the pinned facts last
+        summary = self._compose(fact_lines, turn_lines)
+        while turn_lines and self.count(summary) > self.summary_tokens:
+            turn_lines.pop(0)
+            summary = self._compose(fact_lines, turn_lines)
+        while len(fact_lines) > 1 and self.count(summary) > self.summary_tokens:
+            # The user's name stays
+            fact_lines.pop(next(i for i, line in enumerate(fact_lines) if not line.startswith("- User's name")))
+            summary = self._compose(fact_lines, turn_lines)
+        return summary
+
+    @staticmethod
+    def _compose(fact_lines: List[str], turn_lines: List[str]) -> Optional[str]:
+        sections = []
+        if fact_lines:
+            sections.append("Known facts:\n" + "\n".join(fact_lines))
+        if turn_lines:
+            sections.append("Earlier in the conversation:\n" + "\n".join(turn_lines))
+        return "\n\n".join(sections) if sections else None
+
+    def build(self, messages: List[Dict[str, Any]],
+              facts: Optional[Dict[str, str]] = None) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+        """The messages to send for ``messages`` and a token report.
+
+        The report has ``prompt_tokens`` (the returned messages),
+        ``history_tokens`` (everything, as sent before), ``summarized_messages``
+        and ``summary_tokens``.
+        """
+        system = [message for message in messages if message["role"] in ("developer", "system")]
+        conversation = [message for message in messages if message["role"] not in ("developer", "system")]
+
+        budget = self.max_tokens - self.prompt_tokens(system) - self.summary_tokens - TOKENS_PER_MESSAGE
+        recent: List[Dict[str, Any]] = []
+        used = 0
+        for message in reversed(conversation):
+            tokens = self.message_tokens(message)
+            if len(recent) >= self.min_recent_messages and used + tokens > budget:
+                break
+            recent.insert(0, message)
+            used += tokens
+        older = conversation[:len(conversation) - len(recent)]
+
+        summary = self.summarize(older, facts) if older or facts else None
+        prompt = list(system)
+        if summary:
+            prompt.append({"role": "developer", "content": summary})
+        prompt.extend(recent)
+        report = {
+            "prompt_tokens": self.prompt_tokens(prompt),
+            "history_tokens": self.prompt_tokens(messages),
+            "summarized_messages": len(older),
+            "summary_tokens": self.count(summary),
+        }
+        return prompt, report
+
+
+def facts_from_tool_call(name: str, arguments: Dict[str, Any], result: Any) -> Dict[str, str]:
+    """Facts worth keeping from a tool call once its turn has been summarized"""
+    if name == "create_ticket":
+        facts = {"User's name": arguments["person"]}
+        if isinstance(result, dict) and result.get("ticket_name"):
+            facts[f"Ticket {result['ticket_name']}"] = f"{arguments['level']}: {first_sentence(arguments['question'])}"
+        return facts
+    if name == "get_answer" and isinstance(result, dict) and result.get("answer"):
+        return {f"Answered \"{first_sentence(arguments['question'], 15)}\"": first_sentence(str(result["answer"]))}
+    return {}
+
+
+def remember_facts(facts: "OrderedDict[str, str]", new_facts: Dict[str, str], max_facts: int = 12):
+    """Add ``new_facts``, moving updated ones to the end and dropping the oldest beyond ``max_facts``"""
+    for key, value in new_facts.items():
+        facts.pop(key, None)
+        facts[key] = value
+    while len(facts) > max_facts:
+        # The user's name stays pinned
+        key = next(key for key in facts if key != "User's name")
+        del facts[key]
+
+
+if __name__ == "__main__":
+    context = ContextWindow(max_tokens=400, summary_tokens=120)
+    history = [{"role": "developer", "content": "You are a helpful helpdesk assistant."}]
+    for i in range(20):
+        history.append({"role": "user", "content": f"Question number {i} about the VPN client. It keeps disconnecting."})
+        history.append({"role": "assistant", "content": f"Answer {i}: reinstall the VPN client. Then restart the laptop."})
+    facts = OrderedDict()
+    remember_facts(facts, facts_from_tool_call(
+        "create_ticket", {"person": "John Doe", "level": "HIGH", "question": "VPN keeps disconnecting"},
+        {"ticket_name": "HOOLI-7"},
+    ))
+    prompt, report = context.build(history, facts)
+    print(prompt[1]["content"])
+    print(report)
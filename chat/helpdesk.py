@@ -0,0 +1,193 @@
+"""The Hooli helpdesk: its tools, prompt and settings, and the agent built from them"""
+from typing import Any, Dict, List, Optional
+import environ
+import logging
+import sys
+
+from pydantic import BaseModel, Field
+
+from chroma.main import get_knowledge_base, warm_knowledge_base
+from telegram_handler.dispatcher import get_notification_dispatcher
+from ticket_db.main import TicketDB
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='[%(levelname)s - %(asctime)s] %(message)s',
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+logger = logging.getLogger()
+
+env = environ.Env()
+environ.Env.read_env('.env')
+
+KB_OPTIONS = {
+    'sync': env.bool('KB_SYNC_ON_START', default=False),
+    'cache_path': env('KB_QUERY_CACHE_PATH', default=None),
+    'backend': env('KB_BACKEND', default='auto'),
+    'hybrid': env.bool('KB_HYBRID_SEARCH', default=True),
+}
+
+# Knowledge base matches at least this similar (cosine) are sent to the user directly,
+# without a second completion to rephrase them. 0 disables the fast path.
+DIRECT_ANSWER_THRESHOLD = env.float('KB_DIRECT_ANSWER_THRESHOLD', default=0.0)
+DIRECT_ANSWER_TEMPLATE = env(
+    'KB_DIRECT_ANSWER_TEMPLATE',
+    default="{answer}\n\nDid this solve your problem? If not, I can create a ticket for the helpdesk team.",
+)
+
+# Group-commit ticket inserts from concurrent sessions through a background writer
+TICKETS_WRITE_BEHIND = env.bool('TICKETS_WRITE_BEHIND', default=False)
+
+# Questions at least this similar to an existing ticket of the same person reuse that
+# ticket instead of creating (and notifying) a new one. 0 disables the check.
+TICKETS_DEDUP_THRESHOLD = env.float('TICKETS_DEDUP_THRESHOLD', default=0.0)
+
+# MEDIUM and LOW ticket notifications are sent as one digest per this many seconds,
+# HIGH ones right away. 0 sends every ticket on its own.
+NOTIFICATION_OPTIONS = {
+    'digest_window': env.float('TELEGRAM_DIGEST_WINDOW', default=0.0),
+}
+
+DEVELOPER_PROMPT = """
+    You are a helpful assistant for Hooli helpdesk that answers helpdesk questions. Work as humanly as possible.
+    You have access to the Hooli helpdesk knowledge base.
+    When you are asked a question, you will first search the knowledge base for the answer.
+    For the answer, you will use the `get_answer` tool.
+    After you have answered the question, you will ask the user if they would like to create a ticket.
+    If they would like to create a ticket, you should get the user's name. DO NOT ASK FOR THE NAME IF YOU ALREADY HAVE IT.
+    And you should determine the level of the ticket based on the question. Based on the question, the level should be LOW, MEDIUM, or HIGH.
+    Do not ask the user for the level of the ticket. Just determine it based on the question.
+    Also you should rework the question to make it more concise and clear.
+    After you have all the information, you will use the `create_ticket` tool to create the ticket.
+    Answer the question in a friendly and helpful manner.
+    Irrelevant queries should be ignored. Do not answer them and tell the user that you are not able to answer them.
+    IF THE USER USES CURSES OR ANY OTHER OFFENSIVE LANGUAGE, IGNORE THE MESSAGE AND DO NOT RESPOND.
+    IF THE PROMPT FROM USER HAVE ANY CURSING OR OFFENSIVE LANGUAGE, IGNORE THE MESSAGE AND DO NOT RESPOND.
+    """
+
+# Status line shown while the tools of a turn run
+TOOL_STAGES = {
+    'get_answer': "retrieving from the knowledge base",
+    'create_ticket': "creating ticket",
+}
+
+
+def get_answer(question: str) -> dict:
+    logger.info(f"Searching knowledge base for question: {question}")
+    kb = get_knowledge_base(env('CSV_KNOWLEDGE_BASE_PATH'), **KB_OPTIONS)
+    result = kb.search_knowledge(question)
+    logger.info("Knowledge base search completed")
+    return result
+
+
+class GetAnswer(BaseModel):
+    question: str = Field(..., description="Helpdesk question to be answered.")
+
+
+def create_ticket(question: str, level: str, person: str) -> dict:
+    logger.info(f"Creating ticket for {person} with level {level}")
+    ticket_db = TicketDB(write_behind=TICKETS_WRITE_BEHIND)
+    if TICKETS_DEDUP_THRESHOLD:
+        similar = ticket_db.find_similar_tickets(question, person=person, limit=1, min_similarity=TICKETS_DEDUP_THRESHOLD)
+        if similar:
+            logger.info(f"Attaching to existing ticket {similar[0]['ticket_name']} (similarity {similar[0]['similarity']:.2f})")
+            return {**similar[0], 'duplicate_of_existing_ticket': True}
+    ticket = ticket_db.add_ticket({
+        'question': question,
+        'level': level,
+        'person': person,
+    })
+    # The notification was queued in the outbox with the ticket, the dispatcher sends it
+    get_notification_dispatcher(**NOTIFICATION_OPTIONS).wake()
+    logger.info(f"Ticket created successfully: {ticket['ticket_name']}")
+    return ticket
+
+
+class CreateTicket(BaseModel):
+    question: str = Field(..., description="User question to be answered.")
+    level: str = Field(..., description="Must be LOW, MEDIUM, or HIGH")
+    person: str = Field(..., description="Name of the person asking the question")
+
+
+def get_tools() -> List[Dict[str, Any]]:
+    from openai import pydantic_function_tool
+    answer_tool = pydantic_function_tool(
+        GetAnswer,
+        name="get_answer",
+        description="Get the answer to the helpdesk question.",
+    )
+    create_ticket_tool = pydantic_function_tool(
+        CreateTicket,
+        name="create_ticket",
+        description="Create a ticket for the helpdesk.",
+    )
+    return [answer_tool, create_ticket_tool]
+
+
+def direct_answer(outcomes: List[Dict[str, Any]]) -> Optional[str]:
+    """The reply for a lone, confident knowledge base match, which needs no follow-up completion"""
+    if not DIRECT_ANSWER_THRESHOLD or [outcome['name'] for outcome in outcomes] != ['get_answer']:
+        return None
+    answer_result = outcomes[0]['result']
+    # Gated on the semantic similarity, the ranking score means something else on every
+    # retrieval path; lexical fast-path matches have none and are always rephrased
+    similarity = answer_result.get('similarity') if answer_result is not None else None
+    if similarity is None or similarity < DIRECT_ANSWER_THRESHOLD:
+        return None
+    logger.info(f"Confident knowledge base match (similarity {similarity:.3f}), skipping follow-up completion")
+    return DIRECT_ANSWER_TEMPLATE.format(**answer_result)
+
+
+def build_agent(**agent_options):
+    """The helpdesk agent with the shared, warm resources configured through the environment"""
+    from openai import AsyncOpenAI
+    from chat.agent import HelpdeskAgent
+    from chat.completion_cache import CompletionCache
+    from chat.context import ContextWindow
+    from chat.tools import ToolDispatcher
+
+    # Start loading the embedding model while the first requests come in
+    warm_knowledge_base(env('CSV_KNOWLEDGE_BASE_PATH'), **KB_OPTIONS)
+    # Deliver ticket notifications from the outbox, including any left pending by a previous run
+    get_notification_dispatcher(**NOTIFICATION_OPTIONS)
+
+    # Responses to repeated (and, with a semantic threshold, paraphrased first) questions
+    # are replayed from the cache instead of calling OpenAI. Ticket turns are never cached.
+    completion_cache = None
+    if env.bool('COMPLETION_CACHE', default=True):
+        semantic_threshold = env.float('COMPLETION_CACHE_SEMANTIC_THRESHOLD', default=0.0)
+        # The knowledge base embedding model, so there is only one model in memory
+        def embed_question(text):
+            return get_knowledge_base(env('CSV_KNOWLEDGE_BASE_PATH'), **KB_OPTIONS).embed_query(text)
+
+        completion_cache = CompletionCache(
+            max_size=env.int('COMPLETION_CACHE_SIZE', default=1000),
+            ttl=env.float('COMPLETION_CACHE_TTL', default=86400),
+            persist_path=env('COMPLETION_CACHE_PATH', default=None),
+            embed=embed_question if semantic_threshold else None,
+            semantic_threshold=semantic_threshold,
+        )
+
+    options = {
+        'client': AsyncOpenAI(api_key=env('OPENAI_API_KEY'), base_url=env('OPENAI_BASE_URL', default=None)),
+        'tools': get_tools(),
+        'tool_dispatcher': ToolDispatcher(
+            {'get_answer': get_answer, 'create_ticket': create_ticket},
+            formatters={'get_answer': lambda result: str(result['answer'])},
+        ),
+        'system_prompt': DEVELOPER_PROMPT,
+        # Prompt token budget: recent turns are sent as they are, older ones are folded
+        # into a summary that keeps the user's name, tickets and answers already given
+        'context_window': ContextWindow(
+            max_tokens=env.int('CHAT_CONTEXT_MAX_TOKENS', default=3000),
+            summary_tokens=env.int('CHAT_CONTEXT_SUMMARY_TOKENS', default=300),
+        ),
+        'completion_cache': completion_cache,
+        # Render completions token by token as they arrive
+        'stream': env.bool('OPENAI_STREAM', default=True),
+        'max_concurrency': env.int('OPENAI_MAX_CONCURRENCY', default=16),
+        'tool_stages': TOOL_STAGES,
+        'direct_answer': direct_answer,
+    }
+    options.update(agent_options)
+    return HelpdeskAgent(**options)
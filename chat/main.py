@@ -0,0 +1,161 @@
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+import asyncio
+import contextlib
+import logging
+import sys
+import time
+
+
+class AsyncStreamedCompletion:
+    """One chat completion of an ``AsyncOpenAI`` client, consumed with ``async for``.
+
+    Iterating yields the content as it arrives; afterwards ``content`` holds the
+    full text and ``tool_calls`` the tool calls assembled from their streamed
+    fragments, in the shape the Chat Completions API accepts back in an assistant
+    message. With ``stream=False`` the same interface wraps a regular response.
+    With a ``cache`` (``CompletionCache``) cached responses are replayed without
+    calling OpenAI and new ones are stored; lookups, which may run the embedding
+    model, happen on a worker thread. ``semaphore`` bounds the number of requests
+    to OpenAI in flight.
+    """
+
+    def __init__(self, client, stream: bool = True, cache=None, semaphore: Optional[asyncio.Semaphore] = None,
+                 **request):
+        logging.basicConfig(
+            level=logging.INFO,
+            format='[%(levelname)s - %(asctime)s] %(message)s',
+            handlers=[logging.StreamHandler(sys.stdout)]
+        )
+        self.logger = logging.getLogger()
+        self.client = client
+        self.stream = stream
+        self.cache = cache
+        self.semaphore = semaphore
+        self.request = request
+        self.cached = False
+        self.content: Optional[str] = None
+        self.tool_calls: List[Dict[str, Any]] = []
+        self.finish_reason: Optional[str] = None
+        self.usage: Optional[Dict[str, int]] = None
+        self.started_at: Optional[float] = None
+        self.time_to_first_token: Optional[float] = None
+        self.duration: Optional[float] = None
+        self._consumed = False
+        self._parts: List[str] = []
+        self._fragments: Dict[int, Dict[str, Any]] = {}
+
+    def _log_finished(self):
+        self.duration = time.perf_counter() - self.started_at
+        ttft = f"{self.time_to_first_token * 1000:.0f} ms" if self.time_to_first_token is not None else "-"
+        prompt_tokens = self.usage['prompt_tokens'] if self.usage else "-"
+        self.logger.info(
+            f"{'Cached completion' if self.cached else 'Completion'} finished in {self.duration * 1000:.0f} ms (first token {ttft}, "
+            f"prompt tokens {prompt_tokens}, finish reason {self.finish_reason})"
+        )
+
+    def _mark_first_token(self):
+        if self.time_to_first_token is None:
+            self.time_to_first_token = time.perf_counter() - self.started_at
+
+    def _apply_chunk(self, chunk) -> Optional[str]:
+        """Add a streamed chunk to the completion, return its text delta"""
+        if chunk.usage is not None:
+            self.usage = chunk.usage.model_dump()
+        if not chunk.choices:
+            return None
+        choice = chunk.choices[0]
+        delta = choice.delta
+        if delta.content:
+            self._mark_first_token()
+            self._parts.append(delta.content)
+        # Tool calls arrive in fragments: id and name first, then pieces of the arguments
+        for fragment in delta.tool_calls or []:
+            self._mark_first_token()
+            tool_call = self._fragments.setdefault(fragment.index, {
+                "id": None, "type": "function", "function": {"name": "", "arguments": ""},
+            })
+            if fragment.id:
+                tool_call["id"] = fragment.id
+            if fragment.function is not None:
+                if fragment.function.name:
+                    tool_call["function"]["name"] += fragment.function.name
+                if fragment.function.arguments:
+                    tool_call["function"]["arguments"] += fragment.function.arguments
+        if choice.finish_reason:
+            self.finish_reason = choice.finish_reason
+        return delta.content
+
+    def _finish_stream(self):
+        self.content = "".join(self._parts) if self._parts else None
+        self.tool_calls = [self._fragments[index] for index in sorted(self._fragments)]
+
+    def _apply_response(self, response):
+        self._mark_first_token()
+        message = response.choices[0].message
+        self.finish_reason = response.choices[0].finish_reason
+        self.usage = response.usage.model_dump() if response.usage is not None else None
+        self.content = message.content
+        self.tool_calls = [
+            {"id": tool_call.id, "type": "function",
+             "function": {"name": tool_call.function.name, "arguments": tool_call.function.arguments}}
+            for tool_call in message.tool_calls or []
+        ]
+
+    def response(self) -> Dict[str, Any]:
+        """The parts of the completion the cache keeps"""
+        return {"content": self.content, "tool_calls": self.tool_calls, "finish_reason": self.finish_reason}
+
+    def _iter_cached(self, cached: Dict[str, Any]) -> Iterator[str]:
+        self._mark_first_token()
+        # Entries stored before the finish reason was kept
+        self.finish_reason = cached.get("finish_reason") or ("tool_calls" if cached.get("tool_calls") else "stop")
+        self.content = cached.get("content")
+        self.tool_calls = cached.get("tool_calls") or []
+        if self.content:
+            yield self.content
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        if self._consumed:
+            if self.content:
+                yield self.content
+            return
+        self._consumed = True
+        self.started_at = time.perf_counter()
+        cached = await asyncio.to_thread(self.cache.get, self.request) if self.cache is not None else None
+        if cached is not None:
+            self.cached = True
+            for text in self._iter_cached(cached):
+                yield text
+        else:
+            async with self.semaphore or contextlib.nullcontext():
+                if self.stream:
+                    response = await self.client.chat.completions.create(
+                        stream=True, stream_options={"include_usage": True}, **self.request
+                    )
+                    async for chunk in response:
+                        text = self._apply_chunk(chunk)
+                        if text:
+                            yield text
+                    self._finish_stream()
+                else:
+                    self._apply_response(await self.client.chat.completions.create(**self.request))
+            if not self.stream and self.content:
+                yield self.content
+            if self.cache is not None:
+                await asyncio.to_thread(self.cache.put, self.request, self.response())
+        self._log_finished()
+
+
+if __name__ == "__main__":
+    # Stream a reply from the local mock server: python -m chat.mock_openai
+    from openai import AsyncOpenAI
+
+    async def main():
+        client = AsyncOpenAI(api_key="mock", base_url="http://127.0.0.1:8082/v1")
+        completion = AsyncStreamedCompletion(client, model="gpt-4o-mini", messages=[{"role": "user", "content": "Hello!"}])
+        async for text in completion:
+            print(text, end="", flush=True)
+        print()
+        print(completion.tool_calls, completion.usage)
+
+    asyncio.run(main())
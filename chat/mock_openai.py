@@ -0,0 +1,223 @@
+"""Local stand-in for the OpenAI Chat Completions API, for testing the chat loop offline.
+
+Serves ``POST /v1/chat/completions`` with and without ``stream``. Replies come
+from a script keyed on the last user message, falling back to a simple rule: a
+new user message is answered with a ``get_answer`` tool call (``create_ticket``
+when it mentions a ticket), and tool results are echoed back as the reply.
+Latency before the first byte and between streamed chunks is configurable.
+Point the app at it with ``OPENAI_BASE_URL=http://127.0.0.1:8082/v1``.
+
+    python -m chat.mock_openai --port 8082 --latency 0.3 --chunk-delay 0.02
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional
+import argparse
+import itertools
+import json
+import re
+import threading
+import time
+
+_ids = itertools.count(1)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count, about four characters per token"""
+    return max(1, len(text) // 4) if text else 0
+
+
+def last_message(messages: List[Dict[str, Any]], role: str) -> Optional[Dict[str, Any]]:
+    for message in reversed(messages):
+        if message.get("role") == role:
+            return message
+    return None
+
+
+def default_reply(request: Dict[str, Any]) -> Dict[str, Any]:
+    """Tool call for a new question, a reply built from the tool results otherwise"""
+    messages = request.get("messages", [])
+    if messages and messages[-1].get("role") == "tool":
+        results = [m["content"] for m in messages if m.get("role") == "tool"]
+        return {"content": f"Here is what I found: {results[-1]}"}
+    user = last_message(messages, "user")
+    text = (user or {}).get("content") or ""
+    if not request.get("tools"):
+        return {"content": f"You said: {text}"}
+    if "ticket" in text.lower():
+        return {"tool_calls": [{"name": "create_ticket", "arguments": {"question": text, "level": "MEDIUM", "person": "Mock User"}}]}
+    return {"tool_calls": [{"name": "get_answer", "arguments": {"question": text}}]}
+
+
+class MockOpenAIServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0, chunk_delay: float = 0.0,
+                 script: Optional[Dict[str, Dict[str, Any]]] = None,
+                 responder: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None):
+        """``script`` maps a user message to ``{"content": ..., "tool_calls": [{"name", "arguments"}],
+        "follow_up": ...}``; ``follow_up`` is the reply once the tool results are in.
+        ``responder`` replaces the scripted and default replies altogether."""
+        super().__init__((host, port), _MockRequestHandler)
+        self.latency = latency
+        self.chunk_delay = chunk_delay
+        self.script = {self.normalize(key): value for key, value in (script or {}).items()}
+        self.responder = responder
+        self.requests: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        return re.sub(r"\s+", " ", text or "").strip().lower()
+
+    @property
+    def url(self) -> str:
+        """Base URL for the OpenAI client"""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "MockOpenAIServer":
+        """Serve on a background thread"""
+        self._thread = threading.Thread(target=self.serve_forever, name="openai-mock", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def reply(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        if self.responder is not None:
+            return self.responder(request)
+        messages = request.get("messages", [])
+        user = last_message(messages, "user")
+        scripted = self.script.get(self.normalize((user or {}).get("content") or ""))
+        if scripted is not None:
+            if messages and messages[-1].get("role") == "tool":
+                if "follow_up" in scripted:
+                    return {"content": scripted["follow_up"]}
+            else:
+                return scripted
+        return default_reply(request)
+
+
+class _MockRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        server: MockOpenAIServer = self.server
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}", "type": "invalid_request_error"}})
+            return
+        with server._lock:
+            server.requests.append(request)
+        reply = server.reply(request)
+        if server.latency:
+            time.sleep(server.latency)
+
+        completion_id = f"chatcmpl-mock-{next(_ids)}"
+        tool_calls = [
+            {
+                "id": f"call_mock_{next(_ids)}",
+                "type": "function",
+                "function": {
+                    "name": tool_call["name"],
+                    "arguments": tool_call["arguments"] if isinstance(tool_call["arguments"], str)
+                    else json.dumps(tool_call["arguments"]),
+                },
+            }
+            for tool_call in reply.get("tool_calls") or []
+        ]
+        content = reply.get("content")
+        prompt_tokens = sum(
+            estimate_tokens(message.get("content") or "") + 4 for message in request.get("messages", [])
+        )
+        completion_tokens = estimate_tokens(content or "") + sum(
+            estimate_tokens(tool_call["function"]["arguments"]) for tool_call in tool_calls
+        )
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                 "total_tokens": prompt_tokens + completion_tokens}
+        finish_reason = "tool_calls" if tool_calls else "stop"
+        if request.get("stream"):
+            self._send_stream(request, completion_id, content, tool_calls, finish_reason, usage)
+        else:
+            message = {"role": "assistant", "content": content, "refusal": None}
+            if tool_calls:
+                message["tool_calls"] = tool_calls
+            self._send_json(200, {
+                "id": completion_id, "object": "chat.completion", "created": int(time.time()),
+                "model": request.get("model", "mock"),
+                "choices": [{"index": 0, "message": message, "finish_reason": finish_reason, "logprobs": None}],
+                "usage": usage,
+            })
+
+    def _send_stream(self, request, completion_id, content, tool_calls, finish_reason, usage):
+        server: MockOpenAIServer = self.server
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def chunk(delta, finish=None, choices=True, chunk_usage=None):
+            body = {
+                "id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                "model": request.get("model", "mock"),
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish, "logprobs": None}] if choices else [],
+            }
+            if chunk_usage is not None:
+                body["usage"] = chunk_usage
+            self.wfile.write(f"data: {json.dumps(body)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+            if server.chunk_delay:
+                time.sleep(server.chunk_delay)
+
+        chunk({"role": "assistant", "content": ""})
+        for word in re.findall(r"\S+\s*", content or ""):
+            chunk({"content": word})
+        for index, tool_call in enumerate(tool_calls):
+            chunk({"tool_calls": [{"index": index, "id": tool_call["id"], "type": "function",
+                                   "function": {"name": tool_call["function"]["name"], "arguments": ""}}]})
+            arguments = tool_call["function"]["arguments"]
+            for start in range(0, len(arguments), 16):
+                chunk({"tool_calls": [{"index": index, "function": {"arguments": arguments[start:start + 16]}}]})
+        chunk({}, finish=finish_reason)
+        if (request.get("stream_options") or {}).get("include_usage"):
+            chunk(None, choices=False, chunk_usage=usage)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def _send_json(self, status: int, body: Dict[str, Any]):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8082)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before the first byte of a response")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="seconds between streamed chunks")
+    parser.add_argument("--script", help="JSON file mapping user messages to scripted replies")
+    args = parser.parse_args()
+
+    script = None
+    if args.script:
+        with open(args.script, encoding="utf-8") as f:
+            script = json.load(f)
+    server = MockOpenAIServer(args.host, args.port, args.latency, args.chunk_delay, script=script)
+    print(f"OpenAI mock listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
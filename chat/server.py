@@ -0,0 +1,149 @@
+"""HTTP API of the helpdesk agent, the backend of the Streamlit app.
+
+One worker serves many conversations at once from a single event loop with the
+knowledge base, ticket database and OpenAI client shared between them. Run more
+workers behind a load balancer to scale further; conversations are kept in the
+worker's memory, so route them by id.
+
+    python -m chat.server --port 8000
+
+    POST /conversations/{conversation_id}/messages  {"content": "...", "stream": true}
+    GET  /tickets?before_id=&after_id=&limit=&level=&person=
+    GET  /tickets/stats
+    GET  /health
+    GET  /metrics
+"""
+from contextlib import asynccontextmanager
+from typing import Optional
+import argparse
+import asyncio
+import json
+import logging
+import socket
+import sys
+import threading
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from ticket_db.main import TicketDB
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='[%(levelname)s - %(asctime)s] %(message)s',
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+logger = logging.getLogger()
+
+
+class MessageRequest(BaseModel):
+    content: str
+    stream: bool = True
+
+
+def sse(event: dict) -> str:
+    return f"data: {json.dumps(event)}\n\n"
+
+
+def create_app(agent=None, db_path: str = "tickets.db") -> FastAPI:
+    """The API app; without an ``agent`` one is built from the environment on startup"""
+
+    def start_build() -> asyncio.Future:
+        from chat.helpdesk import build_agent
+        # Built on a worker thread, the ticket endpoints answer while the imports run
+        return asyncio.ensure_future(asyncio.to_thread(build_agent))
+
+    async def get_agent(app: FastAPI):
+        """The agent, once built. A failed build is started again by the next request
+        instead of failing every request until a restart."""
+        build = app.state.agent
+        if build.done() and build.exception() is not None:
+            logger.warning(f"Helpdesk agent build failed ({build.exception()}), building it again")
+            build = app.state.agent = start_build()
+        return await asyncio.shield(build)
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        if agent is None:
+            app.state.agent = start_build()
+        else:
+            app.state.agent = asyncio.get_running_loop().create_future()
+            app.state.agent.set_result(agent)
+        yield
+
+    app = FastAPI(title="Hooli Helpdesk", lifespan=lifespan)
+
+    @app.post("/conversations/{conversation_id}/messages")
+    async def post_message(conversation_id: str, message: MessageRequest, request: Request):
+        """Answer a user message, as a stream of server-sent events or as the final ``done`` event"""
+        helpdesk_agent = await get_agent(request.app)
+        logger.info(f"New user prompt received in conversation {conversation_id}")
+        if not message.stream:
+            return await helpdesk_agent.chat(conversation_id, message.content)
+
+        async def events():
+            try:
+                async for event in helpdesk_agent.turn(conversation_id, message.content):
+                    yield sse(event)
+            except Exception as e:
+                logger.error(f"Turn failed in conversation {conversation_id}: {e}")
+                yield sse({"type": "error", "message": str(e)})
+
+        return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+    # Plain functions run on the worker thread pool, each thread has its own SQLite connection
+    @app.get("/tickets")
+    def get_tickets(before_id: Optional[int] = None, after_id: Optional[int] = None, limit: Optional[int] = None,
+                    level: Optional[str] = None, person: Optional[str] = None):
+        """A page of tickets, newest first; with ``after_id`` the tickets created after it, oldest first"""
+        ticket_db = TicketDB(db_path)
+        if after_id is not None:
+            return ticket_db.get_tickets_since(after_id, limit=limit)
+        return ticket_db.get_tickets_page(before_id=before_id, limit=limit or 50, level=level, person=person)
+
+    @app.get("/tickets/stats")
+    def get_ticket_stats():
+        return TicketDB(db_path).get_stats()
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    @app.get("/metrics")
+    async def metrics(request: Request):
+        helpdesk_agent = await get_agent(request.app)
+        outbox = await asyncio.to_thread(lambda: TicketDB(db_path).get_outbox_stats())
+        return {**helpdesk_agent.stats(), "outbox": outbox}
+
+    return app
+
+
+def start_embedded_server(host: str = "127.0.0.1", port: int = 0, app: Optional[FastAPI] = None) -> str:
+    """Serve the API from a daemon thread of this process and return its base URL.
+
+    The socket is listening when this returns; requests made before the server
+    has started are answered once it has.
+    """
+    import uvicorn
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(128)
+    server = uvicorn.Server(uvicorn.Config(app or create_app(), log_level="warning"))
+    threading.Thread(target=server.run, kwargs={"sockets": [sock]}, name="agent-server", daemon=True).start()
+    url = f"http://{host}:{sock.getsockname()[1]}"
+    logger.info(f"Helpdesk agent serving on {url}")
+    return url
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    uvicorn.run(create_app(), host=args.host, port=args.port)
@@ -0,0 +1,90 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+import json
+import logging
+import sys
+import time
+
+
+class ToolDispatcher:
+    """Runs all tool calls of a completion concurrently on a shared thread pool.
+
+    ``tools`` maps a tool name to a function taking the call's arguments as keyword
+    arguments; ``formatters`` optionally maps a tool name to a function turning its
+    result into the tool message content (``str`` by default). A failing call is
+    reported to the model in its tool message instead of failing the turn.
+    """
+
+    def __init__(self, tools: Dict[str, Callable[..., Any]],
+                 formatters: Optional[Dict[str, Callable[[Any], str]]] = None, max_workers: int = 8):
+        logging.basicConfig(
+            level=logging.INFO,
+            format='[%(levelname)s - %(asctime)s] %(message)s',
+            handlers=[logging.StreamHandler(sys.stdout)]
+        )
+        self.logger = logging.getLogger()
+        self.tools = tools
+        self.formatters = formatters or {}
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tool")
+
+    def run(self, tool_call: Dict[str, Any]) -> Dict[str, Any]:
+        """Run one tool call and return its outcome: the call's ``id``, ``name`` and
+        ``arguments``, the ``result`` or ``error`` and the ``duration`` in seconds"""
+        name = tool_call["function"]["name"]
+        outcome: Dict[str, Any] = {"id": tool_call["id"], "name": name, "arguments": None, "result": None, "error": None}
+        start = time.perf_counter()
+        try:
+            outcome["arguments"] = json.loads(tool_call["function"]["arguments"] or "{}")
+            if name not in self.tools:
+                raise ValueError(f"Unknown tool {name}")
+            outcome["result"] = self.tools[name](**outcome["arguments"])
+        except Exception as e:
+            self.logger.error(f"Tool call {name} failed: {e}")
+            outcome["error"] = str(e)
+        outcome["duration"] = time.perf_counter() - start
+        return outcome
+
+    def dispatch(self, tool_calls: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Run the tool calls concurrently and return their outcomes in call order"""
+        start = time.perf_counter()
+        if len(tool_calls) == 1:
+            outcomes = [self.run(tool_calls[0])]
+        else:
+            outcomes = list(self.executor.map(self.run, tool_calls))
+        self.logger.info(
+            f"Ran {len(tool_calls)} tool call(s) in {(time.perf_counter() - start) * 1000:.0f} ms: "
+            + ", ".join(f"{outcome['name']} {outcome['duration'] * 1000:.0f} ms" for outcome in outcomes)
+        )
+        return outcomes
+
+    def tool_message(self, outcome: Dict[str, Any]) -> Dict[str, Any]:
+        """The tool message reporting an outcome back to the model"""
+        if outcome["error"] is not None:
+            content = f"Error: {outcome['error']}"
+        else:
+            content = self.formatters.get(outcome["name"], str)(outcome["result"])
+        return {"role": "tool", "tool_call_id": outcome["id"], "name": outcome["name"], "content": content}
+
+    def follow_up_messages(self, messages: List[Dict[str, Any]], tool_calls: List[Dict[str, Any]],
+                           outcomes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """``messages`` followed by the assistant's tool calls and one tool message per call"""
+        return [
+            *messages,
+            {"role": "assistant", "content": None, "tool_calls": tool_calls},
+            *(self.tool_message(outcome) for outcome in outcomes),
+        ]
+
+
+if __name__ == "__main__":
+    def slow_search(question: str) -> str:
+        time.sleep(0.5)
+        return f"Answer to {question}"
+
+    dispatcher = ToolDispatcher({"get_answer": slow_search})
+    calls = [
+        {"id": f"call_{i}", "type": "function",
+         "function": {"name": "get_answer", "arguments": json.dumps({"question": f"question {i}"})}}
+        for i in range(3)
+    ]
+    for message in dispatcher.follow_up_messages([], calls, dispatcher.dispatch(calls))[1:]:
+        print(message)
@@ -0,0 +1,340 @@
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+def distance_to_similarity(distance: float) -> float:
+    """Cosine similarity of two unit vectors from their squared L2 distance"""
+    return 1.0 - distance / 2.0
+
+
+class VectorBackend:
+    """Interface of the retrieval backends used by ChromaKnowledgeBase.
+
+    The Chroma collection stays the source of truth for the knowledge base; a backend
+    only answers top-k queries for already computed query embeddings. Distances are
+    squared L2 distances between the (unit length) MiniLM embeddings, the same metric
+    Chroma uses by default, so scores are comparable across backends. Every hit also
+    carries ``score``, the cosine similarity derived from the distance.
+    """
+
+    name = "base"
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.logger = logging.getLogger()
+
+    def refresh(self):
+        """Pick up changes after the collection was seeded or synced"""
+
+    def memory_footprint(self) -> Dict[str, int]:
+        """Bytes of embedding data the backend keeps in process memory"""
+        return {}
+
+    def query(self, embeddings: Sequence[Sequence[float]], n_results: int) -> List[List[Dict]]:
+        """Return, per query embedding, the top ``n_results`` hits as dicts with
+        ``id``, ``question``, ``answer``, ``distance`` and ``score``"""
+        raise NotImplementedError
+
+
+class ChromaBackend(VectorBackend):
+    """Approximate search through Chroma's HNSW index"""
+
+    name = "chroma"
+
+    def query(self, embeddings: Sequence[Sequence[float]], n_results: int) -> List[List[Dict]]:
+        results = self.collection.query(
+            query_embeddings=list(embeddings),
+            n_results=n_results,
+            include=["documents", "metadatas", "distances"]
+        )
+        return [
+            [
+                {
+                    "id": id_,
+                    "question": document,
+                    "answer": metadata['answer'],
+                    "distance": distance,
+                    "score": distance_to_similarity(distance),
+                }
+                for id_, document, metadata, distance in zip(ids, documents, metadatas, distances)
+            ]
+            for ids, documents, metadatas, distances in zip(
+                results['ids'], results['documents'], results['metadatas'], results['distances']
+            )
+        ]
+
+
+class NumpyBackend(VectorBackend):
+    """Exact in-process search over a contiguous float32 matrix of normalized embeddings.
+
+    A query is one matrix multiplication plus ``argpartition``, which for small and
+    medium knowledge bases is far cheaper than going through Chroma.
+    """
+
+    name = "numpy"
+
+    def __init__(self, collection):
+        super().__init__(collection)
+        self._lock = threading.Lock()
+        self._index = (np.zeros((0, 0), dtype=np.float32), [], [], [])
+
+    @staticmethod
+    def normalize(vectors) -> np.ndarray:
+        matrix = np.ascontiguousarray(vectors, dtype=np.float32)
+        if matrix.ndim == 1:
+            matrix = matrix.reshape(1, -1)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def refresh(self):
+        start_time = time.time()
+        data = self.collection.get(include=["embeddings", "documents", "metadatas"])
+        if len(data['ids']) == 0:
+            matrix = np.zeros((0, 0), dtype=np.float32)
+        else:
+            matrix = self.normalize(data['embeddings'])
+        answers = [metadata['answer'] for metadata in data['metadatas']]
+        # Swap the whole index at once so concurrent queries never see a partial update
+        with self._lock:
+            self._index = (matrix, list(data['ids']), list(data['documents']), answers)
+        self.logger.info(f"Loaded {len(answers)} embeddings into the NumPy index in {time.time() - start_time:.2f} seconds")
+
+    def memory_footprint(self) -> Dict[str, int]:
+        return {"embeddings_bytes": int(self._index[0].nbytes)}
+
+    def top_k(self, matrix: np.ndarray, queries: np.ndarray, k: int):
+        """Indices and cosine similarities of the ``k`` best rows per query, best first"""
+        similarities = queries @ matrix.T
+        if k < matrix.shape[0]:
+            candidates = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+        else:
+            candidates = np.broadcast_to(np.arange(matrix.shape[0]), (queries.shape[0], matrix.shape[0]))
+        candidate_similarities = np.take_along_axis(similarities, candidates, axis=1)
+        order = np.argsort(-candidate_similarities, axis=1)
+        return np.take_along_axis(candidates, order, axis=1), np.take_along_axis(candidate_similarities, order, axis=1)
+
+    def query(self, embeddings: Sequence[Sequence[float]], n_results: int) -> List[List[Dict]]:
+        matrix, ids, documents, answers = self._index
+        if len(ids) == 0:
+            return [[] for _ in embeddings]
+        indices, similarities = self.top_k(matrix, self.normalize(embeddings), min(n_results, len(ids)))
+        return [
+            [
+                {
+                    "id": ids[i],
+                    "question": documents[i],
+                    "answer": answers[i],
+                    "distance": float(2.0 - 2.0 * similarity),
+                    "score": float(similarity),
+                }
+                for i, similarity in zip(row_indices, row_similarities)
+            ]
+            for row_indices, row_similarities in zip(indices, similarities)
+        ]
+
+
+class QuantizedBackend(NumpyBackend):
+    """In-process search over int8 or binary quantized embeddings with float rescoring.
+
+    Only the quantized codes are kept in memory: 4x smaller than float32 for ``int8``
+    (per-dimension scales) and 32x smaller for ``binary`` (sign bits). A first pass over
+    the codes (int8 dot products or Hamming distances) selects ``rescore_factor * k``
+    candidates, which are then rescored exactly against the float32 vectors kept in a
+    memory-mapped file next to the Chroma data.
+    """
+
+    name = "quantized"
+
+    def __init__(self, collection, quantization: str = "int8", vectors_path: Optional[str] = None,
+                 rescore_factor: int = 10, block_size: int = 16384):
+        super().__init__(collection)
+        if quantization not in ("int8", "binary"):
+            raise ValueError(f"Unknown quantization '{quantization}', expected 'int8' or 'binary'")
+        self.quantization = quantization
+        self.vectors_path = vectors_path or "kb_vectors.f32.npy"
+        self.rescore_factor = rescore_factor
+        self.block_size = block_size
+        # (codes, int8 scales, float32 memmap, ids, documents, answers)
+        self._index = (np.zeros((0, 0), dtype=np.int8), None, None, [], [], [])
+
+    def _write_vectors(self) -> Tuple[Optional[np.ndarray], List[str], List[str], List[str]]:
+        """Stream the collection embeddings into a float32 memmap, normalized, page by page.
+
+        Returns the read-only memmap (None for an empty collection) with the ids,
+        documents and answers. The file is written under a temporary name and moved
+        into place, so processes that have the previous file mapped keep reading it.
+        """
+        count = self.collection.count()
+        ids, documents, answers = [], [], []
+        vectors = None
+        temp_path = None
+        try:
+            for offset in range(0, count, self.block_size):
+                page = self.collection.get(include=["embeddings", "documents", "metadatas"],
+                                           limit=self.block_size, offset=offset)
+                if vectors is None:
+                    dim = len(page['embeddings'][0])
+                    directory = os.path.dirname(self.vectors_path) or "."
+                    os.makedirs(directory, exist_ok=True)
+                    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(self.vectors_path), suffix=".tmp")
+                    os.close(fd)
+                    vectors = np.lib.format.open_memmap(temp_path, mode="w+", dtype=np.float32, shape=(count, dim))
+                vectors[offset:offset + len(page['ids'])] = self.normalize(page['embeddings'])
+                ids.extend(page['ids'])
+                documents.extend(page['documents'])
+                answers.extend(metadata['answer'] for metadata in page['metadatas'])
+            if vectors is not None:
+                vectors.flush()
+                del vectors
+                os.replace(temp_path, self.vectors_path)
+                temp_path = None
+                vectors = np.load(self.vectors_path, mmap_mode="r")
+        finally:
+            if temp_path is not None and os.path.exists(temp_path):
+                os.remove(temp_path)
+        return vectors, ids, documents, answers
+
+    def refresh(self):
+        start_time = time.time()
+        vectors, ids, documents, answers = self._write_vectors()
+        scales = None
+        if vectors is None:
+            codes = np.zeros((0, 0), dtype=np.int8)
+        elif self.quantization == "int8":
+            max_abs = np.zeros(vectors.shape[1], dtype=np.float32)
+            for start in range(0, len(vectors), self.block_size):
+                max_abs = np.maximum(max_abs, np.abs(vectors[start:start + self.block_size]).max(axis=0))
+            scales = np.where(max_abs > 0, max_abs / 127.0, 1.0).astype(np.float32)
+            codes = np.empty(vectors.shape, dtype=np.int8)
+            for start in range(0, len(vectors), self.block_size):
+                block = vectors[start:start + self.block_size]
+                codes[start:start + len(block)] = np.clip(np.rint(block / scales), -127, 127)
+        else:
+            codes = np.empty((len(vectors), (vectors.shape[1] + 7) // 8), dtype=np.uint8)
+            for start in range(0, len(vectors), self.block_size):
+                block = vectors[start:start + self.block_size]
+                codes[start:start + len(block)] = np.packbits(block > 0, axis=1)
+        with self._lock:
+            self._index = (codes, scales, vectors, ids, documents, answers)
+        self.logger.info(
+            f"Loaded {len(ids)} {self.quantization} quantized embeddings in {time.time() - start_time:.2f} seconds: "
+            f"{self.memory_footprint()}"
+        )
+
+    def memory_footprint(self) -> Dict[str, int]:
+        codes, scales, vectors, *_ = self._index
+        footprint = {
+            "codes_bytes": int(codes.nbytes + (scales.nbytes if scales is not None else 0)),
+            "float32_bytes": int(vectors.size * 4) if vectors is not None else 0,
+        }
+        footprint["compression_ratio"] = round(footprint["float32_bytes"] / footprint["codes_bytes"], 1) if footprint["codes_bytes"] else 0
+        return footprint
+
+    @staticmethod
+    def _popcount(values: np.ndarray) -> np.ndarray:
+        if hasattr(np, "bitwise_count"):
+            return np.bitwise_count(values)
+        return np.unpackbits(values[..., np.newaxis], axis=-1).sum(axis=-1, dtype=np.uint8)
+
+    def first_pass(self, codes: np.ndarray, scales: Optional[np.ndarray], queries: np.ndarray) -> np.ndarray:
+        """Approximate similarities (higher is better) of every row to every query"""
+        scores = np.empty((len(queries), len(codes)), dtype=np.float32)
+        if self.quantization == "int8":
+            scaled_queries = queries * scales
+            for start in range(0, len(codes), self.block_size):
+                block = codes[start:start + self.block_size].astype(np.float32)
+                scores[:, start:start + len(block)] = scaled_queries @ block.T
+        else:
+            query_bits = np.packbits(queries > 0, axis=1)
+            for start in range(0, len(codes), self.block_size):
+                block = codes[start:start + self.block_size]
+                for i, bits in enumerate(query_bits):
+                    scores[i, start:start + len(block)] = -self._popcount(block ^ bits).sum(axis=1, dtype=np.int32)
+        return scores
+
+    def search(self, queries: np.ndarray, k: int, rescore: bool = True):
+        """Indices and similarities of the ``k`` best rows per query, best first"""
+        codes, scales, vectors, ids, *_ = self._index
+        k = min(k, len(ids))
+        scores = self.first_pass(codes, scales, queries)
+        n_candidates = min(len(ids), max(k, k * self.rescore_factor)) if rescore else k
+        if n_candidates < len(ids):
+            candidates = np.argpartition(-scores, n_candidates - 1, axis=1)[:, :n_candidates]
+        else:
+            candidates = np.broadcast_to(np.arange(len(ids)), (len(queries), len(ids)))
+        if rescore:
+            # Sorted rows turn the memmap reads into a forward scan
+            candidates = np.sort(candidates, axis=1)
+            candidate_scores = np.stack([vectors[row] @ query for row, query in zip(candidates, queries)])
+        else:
+            candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+        order = np.argsort(-candidate_scores, axis=1)[:, :k]
+        return np.take_along_axis(candidates, order, axis=1), np.take_along_axis(candidate_scores, order, axis=1)
+
+    def query(self, embeddings: Sequence[Sequence[float]], n_results: int) -> List[List[Dict]]:
+        _, _, _, ids, documents, answers = self._index
+        if len(ids) == 0:
+            return [[] for _ in embeddings]
+        indices, similarities = self.search(self.normalize(embeddings), n_results)
+        return [
+            [
+                {
+                    "id": ids[i],
+                    "question": documents[i],
+                    "answer": answers[i],
+                    "distance": float(2.0 - 2.0 * similarity),
+                    "score": float(similarity),
+                }
+                for i, similarity in zip(row_indices, row_similarities)
+            ]
+            for row_indices, row_similarities in zip(indices, similarities)
+        ]
+
+    def evaluate_recall(self, embeddings: Sequence[Sequence[float]], k: int = 3) -> Dict[str, float]:
+        """Recall@k of the quantized search, with and without rescoring, against exact search"""
+        _, _, vectors, ids, *_ = self._index
+        if len(ids) == 0:
+            return {}
+        queries = self.normalize(embeddings)
+        exact = [set(row) for row in self.top_k(np.asarray(vectors), queries, min(k, len(ids)))[0]]
+
+        def recall(indices: np.ndarray) -> float:
+            return float(np.mean([len(expected & set(row)) / len(expected) for expected, row in zip(exact, indices)]))
+
+        return {
+            f"recall@{k}": recall(self.search(queries, k)[0]),
+            f"recall@{k}_first_pass": recall(self.search(queries, k, rescore=False)[0]),
+        }
+
+
+BACKENDS = {
+    ChromaBackend.name: ChromaBackend,
+    NumpyBackend.name: NumpyBackend,
+    "int8": QuantizedBackend,
+    "binary": QuantizedBackend,
+}
+
+
+def create_backend(name: str, collection, numpy_max_rows: int = 200_000,
+                   vectors_path: Optional[str] = None) -> VectorBackend:
+    """Create a retrieval backend by name.
+
+    ``auto`` keeps the whole index in memory with the exact NumPy backend while the
+    collection has at most ``numpy_max_rows`` rows and falls back to Chroma above that.
+    ``int8`` and ``binary`` keep quantized codes in memory and rescore the best
+    candidates against float32 vectors memory-mapped from ``vectors_path``.
+    """
+    if name == "auto":
+        name = NumpyBackend.name if collection.count() <= numpy_max_rows else ChromaBackend.name
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown retrieval backend '{name}', expected one of: auto, {', '.join(BACKENDS)}")
+    if BACKENDS[name] is QuantizedBackend:
+        return QuantizedBackend(collection, quantization=name, vectors_path=vectors_path)
+    return BACKENDS[name](collection)
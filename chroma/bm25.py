@@ -0,0 +1,109 @@
+import heapq
+import logging
+import math
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, Sequence, Tuple
+
+STOPWORDS = {
+    "a", "an", "and", "are", "can", "do", "does", "for", "how", "i", "in", "is", "it", "my",
+    "of", "on", "or", "the", "to", "what", "when", "where", "why", "with", "you", "your",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word and number tokens, without stopwords"""
+    return [token for token in re.findall(r"[a-z0-9]+", str(text).lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """In-memory BM25 inverted index over the knowledge base questions and answers.
+
+    Exact product terms ("HooliVPN", "Exchange", "4357") are matched without running
+    the embedding model, which lets confident lexical hits skip semantic search.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.logger = logging.getLogger()
+        self._lock = threading.Lock()
+        self._index = self._build([], [], [])
+
+    def _build(self, ids: List[str], questions: List[str], answers: List[str]) -> Dict:
+        postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        lengths = []
+        for i, (question, answer) in enumerate(zip(questions, answers)):
+            # The question is indexed twice so that it outweighs the answer text
+            tokens = tokenize(question) * 2 + tokenize(answer)
+            lengths.append(len(tokens))
+            for token, tf in Counter(tokens).items():
+                postings[token].append((i, tf))
+        n_docs = len(ids)
+        idf = {
+            token: math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            for token, docs in postings.items()
+        }
+        return {
+            "ids": ids,
+            "questions": questions,
+            "answers": answers,
+            "postings": dict(postings),
+            "idf": idf,
+            "lengths": lengths,
+            "avg_length": sum(lengths) / n_docs if n_docs else 0.0,
+            # idf of a term that is not in the index at all
+            "missing_idf": math.log(1 + (n_docs + 0.5) / 0.5),
+        }
+
+    def build(self, ids: Sequence[str], questions: Sequence[str], answers: Sequence[str]):
+        start_time = time.time()
+        index = self._build(list(ids), list(questions), list(answers))
+        with self._lock:
+            self._index = index
+        self.logger.info(f"Built BM25 index over {len(index['ids'])} documents in {time.time() - start_time:.2f} seconds")
+
+    def build_from_collection(self, collection):
+        data = collection.get(include=["documents", "metadatas"])
+        self.build(data['ids'], data['documents'], [metadata['answer'] for metadata in data['metadatas']])
+
+    def search(self, query: str, k: int = 10) -> List[Dict]:
+        """Top ``k`` documents for the query, best first.
+
+        Besides the BM25 ``lexical_score`` every hit carries its ``coverage``: the
+        idf-weighted share of the query terms found in the document (1.0 means every
+        query term matched).
+        """
+        index = self._index
+        terms = set(tokenize(query))
+        if not terms or not index["ids"]:
+            return []
+        scores: Dict[int, float] = defaultdict(float)
+        matched: Dict[int, float] = defaultdict(float)
+        total_idf = 0.0
+        for term in terms:
+            idf = index["idf"].get(term)
+            if idf is None:
+                total_idf += index["missing_idf"]
+                continue
+            total_idf += idf
+            for i, tf in index["postings"][term]:
+                length_norm = 1 - self.b + self.b * index["lengths"][i] / index["avg_length"]
+                scores[i] += idf * tf * (self.k1 + 1) / (tf + self.k1 * length_norm)
+                matched[i] += idf
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [
+            {
+                "id": index["ids"][i],
+                "question": index["questions"][i],
+                "answer": index["answers"][i],
+                "lexical_score": score,
+                "coverage": matched[i] / total_idf,
+            }
+            for i, score in best
+        ]
+
+    def __len__(self) -> int:
+        return len(self._index["ids"])
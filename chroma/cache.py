@@ -0,0 +1,155 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a query so trivially different spellings share a cache entry"""
+    return " ".join(query.lower().split()).rstrip("?!. ")
+
+
+class LRUCache:
+    """Thread-safe LRU cache with an optional time-to-live per entry"""
+
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and self.ttl is not None and time.time() - entry[0] > self.ttl:
+                del self._data[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, value: Any, created_at: Optional[float] = None):
+        with self._lock:
+            self._data[key] = (created_at or time.time(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def items(self) -> List[tuple]:
+        with self._lock:
+            return [(key, created_at, value) for key, (created_at, value) in self._data.items()]
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class QueryCache:
+    """Two-level cache in front of the knowledge base search.
+
+    The first level maps a normalized query to its embedding, so repeated questions
+    skip the embedding model. The second level maps the query and ``n_results`` to the
+    search hits, so repeated questions skip the vector search too. Hits are tagged with
+    the collection generation and dropped whenever the collection changes. Callers get
+    copies, so changing a returned hit does not change the cache.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = 3600,
+                 persist_path: Optional[str] = None, persist_interval: float = 30.0):
+        self.logger = logging.getLogger()
+        self.embeddings = LRUCache(max_size, ttl)
+        self.results = LRUCache(max_size, ttl)
+        self.generation = ""
+        self.persist_path = persist_path
+        self.persist_interval = persist_interval
+        self._dirty = False
+        self._last_persist = time.time()
+        self._persist_lock = threading.Lock()
+        if persist_path:
+            self.load()
+            atexit.register(self.save)
+
+    def get_embedding(self, query: str) -> Optional[List[float]]:
+        embedding = self.embeddings.get(normalize_query(query))
+        return list(embedding) if embedding is not None else None
+
+    def put_embedding(self, query: str, embedding: List[float]):
+        self.embeddings.put(normalize_query(query), [float(x) for x in embedding])
+        self._mark_dirty()
+
+    def get_results(self, query: str, n_results: int) -> Optional[List[Dict]]:
+        hits = self.results.get(f"{n_results}:{normalize_query(query)}")
+        return [dict(hit) for hit in hits] if hits is not None else None
+
+    def put_results(self, query: str, n_results: int, hits: List[Dict]):
+        self.results.put(f"{n_results}:{normalize_query(query)}", [dict(hit) for hit in hits])
+        self._mark_dirty()
+
+    def set_generation(self, generation: str):
+        """Invalidate the cached search hits when the collection content or retrieval settings change"""
+        if generation != self.generation:
+            if self.generation:
+                self.logger.info("Knowledge base changed, invalidating cached search results")
+            self.results.clear()
+            self.generation = generation
+            self._mark_dirty()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "embedding_hits": self.embeddings.hits,
+            "embedding_misses": self.embeddings.misses,
+            "embedding_entries": len(self.embeddings),
+            "result_hits": self.results.hits,
+            "result_misses": self.results.misses,
+            "result_entries": len(self.results),
+        }
+
+    def _mark_dirty(self):
+        self._dirty = True
+        if self.persist_path and time.time() - self._last_persist > self.persist_interval:
+            self.save()
+
+    def load(self):
+        if not self.persist_path or not os.path.exists(self.persist_path):
+            return
+        try:
+            with open(self.persist_path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Ignoring unreadable query cache {self.persist_path}: {e}")
+            return
+        self.generation = data.get("generation", "")
+        for key, created_at, value in data.get("embeddings", []):
+            self.embeddings.put(key, value, created_at)
+        for key, created_at, value in data.get("results", []):
+            self.results.put(key, value, created_at)
+        self.logger.info(f"Loaded query cache from {self.persist_path}: {self.stats()}")
+
+    def save(self):
+        if not self.persist_path or not self._dirty:
+            return
+        with self._persist_lock:
+            data = {
+                "generation": self.generation,
+                "embeddings": self.embeddings.items(),
+                "results": self.results.items(),
+            }
+            os.makedirs(os.path.dirname(self.persist_path) or ".", exist_ok=True)
+            tmp_path = f"{self.persist_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.persist_path)
+            self._dirty = False
+            self._last_persist = time.time()
@@ -1,12 +1,40 @@
-import chromadb
-from chromadb.utils import embedding_functions
-import pandas as pd
+import hashlib
+import json
 import logging
+import os
 import sys
+import threading
 import time
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple
+from chroma.bm25 import BM25Index
+from chroma.cache import QueryCache
+
+# chromadb, sentence-transformers, pandas and numpy take seconds to import, so they are
+# only imported once a knowledge base is actually created
+if TYPE_CHECKING:
+    from chroma.backends import VectorBackend
+
+
+def question_id(question: str) -> str:
+    """Stable id of a Q&A pair, derived from its (normalized) question text"""
+    normalized = " ".join(str(question).split()).lower()
+    return "q-" + hashlib.sha256(normalized.encode("utf-8")).hexdigest()[:32]
+
+
+def row_hash(question: str, answer: str) -> str:
+    """Content hash of a Q&A pair, changes whenever the question or the answer is edited"""
+    return hashlib.sha256(f"{question}\x1f{answer}".encode("utf-8")).hexdigest()
+
 
 class ChromaKnowledgeBase:
-    def __init__(self, db_path: str = "chroma_data", collection_name: str = "it_knowledge_base"):
+    def __init__(self, db_path: str = "chroma_data", collection_name: str = "it_knowledge_base",
+                 cache_size: int = 1024, cache_ttl: Optional[float] = 3600, cache_path: Optional[str] = None,
+                 backend: str = "chroma", numpy_max_rows: int = 200_000,
+                 hybrid: bool = False, hybrid_alpha: float = 0.7, hybrid_candidates: int = 10,
+                 lexical_min_coverage: float = 0.9, lexical_margin: float = 1.5):
+        self.db_path = db_path
+        self.collection_name = collection_name
+
         logging.basicConfig(
             level=logging.INFO,
             format='[%(levelname)s - %(asctime)s] %(message)s',
@@ -14,6 +42,9 @@ class ChromaKnowledgeBase:
         )
         self.logger = logging.getLogger()
         
+        import chromadb
+        from chromadb.utils import embedding_functions
+
         # Initialize ChromaDB client
         self.client = chromadb.PersistentClient(
             path=db_path, 
@@ -31,45 +62,335 @@ class ChromaKnowledgeBase:
             embedding_function=self.sentence_transformer_ef
         )
 
-    def load_data_from_csv(self, csv_file_path: str):
-        df = pd.read_csv(csv_file_path)
+        self.manifest_path = os.path.join(db_path, f"{collection_name}_manifest.json")
+        self._init_lock = threading.RLock()
+        self.initialized = False
 
-        if not all(col in df.columns for col in ['Question', 'Answer']):
-            raise ValueError("CSV must contain 'Question' and 'Answer' columns")
-        
-        questions = df['Question'].tolist()
-        answers = df['Answer'].tolist()
+        # Retrieval backend ("chroma", "numpy" or "auto"), created once the collection is loaded
+        self.backend_name = backend
+        self.numpy_max_rows = numpy_max_rows
+        self.backend: Optional["VectorBackend"] = None
 
-        self.logger.info(f"Successfully loaded {len(questions)} QA pairs from CSV")
-        
-        return questions, answers
+        # BM25 index for hybrid retrieval; confident lexical hits skip the embedding model
+        self.lexical_index = BM25Index() if hybrid else None
+        self.hybrid_alpha = hybrid_alpha
+        self.hybrid_candidates = hybrid_candidates
+        self.lexical_min_coverage = lexical_min_coverage
+        self.lexical_margin = lexical_margin
+
+        # Cache of query embeddings and search hits, invalidated when the collection changes
+        self.query_cache = QueryCache(max_size=cache_size, ttl=cache_ttl, persist_path=cache_path)
+
+    def iter_csv_chunks(self, csv_file_path: str, chunk_size: int = 1000) -> Iterator[Tuple[List[str], List[str]]]:
+        """Stream Q&A pairs from the CSV in chunks so large files are never fully loaded"""
+        import pandas as pd
+
+        for df in pd.read_csv(csv_file_path, chunksize=chunk_size):
+            if not all(col in df.columns for col in ['Question', 'Answer']):
+                raise ValueError("CSV must contain 'Question' and 'Answer' columns")
+            df = df.dropna(subset=['Question', 'Answer'])
+            yield df['Question'].astype(str).tolist(), df['Answer'].astype(str).tolist()
+
+    def load_manifest(self) -> Dict[str, str]:
+        """Load the id -> row hash manifest of the last sync"""
+        if self.collection.count() == 0:
+            return {}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, encoding="utf-8") as f:
+                return json.load(f)
+        # No manifest yet (e.g. a collection seeded with positional ids): rebuild it
+        # from the stored metadata once and save it, later starts skip the full scan.
+        # Rows without a hash will simply be re-embedded by the next sync.
+        existing = self.collection.get(include=["metadatas"])
+        manifest = {
+            id_: (metadata or {}).get("hash", "")
+            for id_, metadata in zip(existing['ids'], existing['metadatas'])
+        }
+        self.save_manifest(manifest)
+        return manifest
+
+    def save_manifest(self, manifest: Dict[str, str]):
+        os.makedirs(os.path.dirname(self.manifest_path) or ".", exist_ok=True)
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self.manifest_path)
+
+    def sync_from_csv(self, csv_file_path: str, chunk_size: int = 1000, batch_size: int = 256) -> Dict[str, int]:
+        """Incrementally bring the collection in line with the CSV.
+
+        Ids are derived from the question text and every row is fingerprinted, so only
+        new or edited pairs are embedded and upserted, and pairs removed from the CSV
+        are deleted. The CSV is streamed in chunks and embedded in batches, which keeps
+        memory bounded regardless of the file size.
+        """
+        start_time = time.time()
+        manifest = self.load_manifest()
+        new_manifest: Dict[str, str] = {}
+        stats = {"added": 0, "updated": 0, "deleted": 0, "unchanged": 0}
+
+        for questions, answers in self.iter_csv_chunks(csv_file_path, chunk_size):
+            changed: Dict[str, Tuple[str, str, str]] = {}
+            for question, answer in zip(questions, answers):
+                id_ = question_id(question)
+                digest = row_hash(question, answer)
+                new_manifest[id_] = digest
+                if manifest.get(id_) == digest:
+                    changed.pop(id_, None)
+                    continue
+                changed[id_] = (question, answer, digest)
+
+            items = list(changed.items())
+            for i in range(0, len(items), batch_size):
+                batch = items[i:i + batch_size]
+                documents = [question for _, (question, _, _) in batch]
+                self.collection.upsert(
+                    ids=[id_ for id_, _ in batch],
+                    documents=documents,
+                    embeddings=self.sentence_transformer_ef(documents),
+                    metadatas=[{"answer": answer, "hash": digest} for _, (_, answer, digest) in batch],
+                )
+                for id_, _ in batch:
+                    stats["updated" if id_ in manifest else "added"] += 1
+
+        stats["unchanged"] = len(new_manifest) - stats["added"] - stats["updated"]
+        removed = [id_ for id_ in manifest if id_ not in new_manifest]
+        for i in range(0, len(removed), batch_size):
+            self.collection.delete(ids=removed[i:i + batch_size])
+        stats["deleted"] = len(removed)
+
+        self.save_manifest(new_manifest)
+        self.update_generation(new_manifest)
+        if self.backend is not None and (stats["added"] or stats["updated"] or stats["deleted"]):
+            self.refresh_indexes()
+        self.logger.info(f"Synced knowledge base from {csv_file_path} in {time.time() - start_time:.2f} seconds: {stats}")
+        return stats
+
+    def update_generation(self, manifest: Dict[str, str]):
+        """Fingerprint the collection content and the retrieval settings; cached search
+        hits are only valid for one generation"""
+        retrieval = {
+            "backend": self.backend_name,
+            "numpy_max_rows": self.numpy_max_rows,
+            "hybrid": self.lexical_index is not None,
+            "hybrid_alpha": self.hybrid_alpha,
+            "hybrid_candidates": self.hybrid_candidates,
+            "lexical_min_coverage": self.lexical_min_coverage,
+            "lexical_margin": self.lexical_margin,
+        }
+        fingerprint = json.dumps({"manifest": sorted(manifest.items()), "retrieval": retrieval}, sort_keys=True)
+        digest = hashlib.sha256(fingerprint.encode("utf-8")).hexdigest()
+        self.query_cache.set_generation(digest)
 
     def seed_initial_data(self, csv_file_path: str):
-        questions, answers = self.load_data_from_csv(csv_file_path)
-        self.collection.add(
-            documents=questions,
-            metadatas=[{"answer": answer} for answer in answers],
-            ids=[f"id{i}" for i in range(len(questions))]
-        )
+        self.sync_from_csv(csv_file_path)
 
-    def initialize_database(self, csv_file_path: str):
-        if len(self.collection.get()['ids']) == 0:
-            self.seed_initial_data(csv_file_path)
-            self.logger.info("Database seeded with initial data!")
-        else:
-            self.logger.info("Using existing database")
+    def initialize_database(self, csv_file_path: str, sync: bool = False):
+        with self._init_lock:
+            if self.initialized:
+                return
+            # count() is answered from the segment metadata, no ids are fetched
+            if self.collection.count() == 0:
+                self.seed_initial_data(csv_file_path)
+                self.logger.info("Database seeded with initial data!")
+            elif sync:
+                self.sync_from_csv(csv_file_path)
+            else:
+                self.update_generation(self.load_manifest())
+                self.logger.info("Using existing database")
+            self.get_backend()
+            if self.lexical_index is not None:
+                self.lexical_index.build_from_collection(self.collection)
+            self.initialized = True
 
-    def search_knowledge(self, user_query: str, n_results: int = 3):
+    def refresh_indexes(self):
+        """Reload the in-memory indexes after the collection changed"""
+        self.get_backend().refresh()
+        if self.lexical_index is not None:
+            self.lexical_index.build_from_collection(self.collection)
+
+    def get_backend(self) -> "VectorBackend":
+        if self.backend is None:
+            from chroma.backends import create_backend
+
+            with self._init_lock:
+                if self.backend is None:
+                    backend = create_backend(
+                        self.backend_name, self.collection, self.numpy_max_rows,
+                        vectors_path=os.path.join(self.db_path, f"{self.collection_name}_vectors.f32.npy"),
+                    )
+                    backend.refresh()
+                    self.logger.info(f"Using '{backend.name}' retrieval backend")
+                    self.backend = backend
+        return self.backend
+
+    def backend_report(self, queries: Optional[List[str]] = None, k: int = 3) -> Dict:
+        """Memory footprint of the retrieval backend and, for quantized backends,
+        recall@k of the given queries versus exact search"""
+        backend = self.get_backend()
+        report = {"backend": self.backend_name, **backend.memory_footprint()}
+        if queries and hasattr(backend, "evaluate_recall"):
+            report.update(backend.evaluate_recall(self.embed_queries(queries), k))
+        return report
+
+    def embed_query(self, user_query: str) -> List[float]:
+        return self.embed_queries([user_query])[0]
+
+    def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """Embed queries, running the model once for all queries missing from the cache"""
+        embeddings = [self.query_cache.get_embedding(query) for query in queries]
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            computed = self.sentence_transformer_ef([queries[i] for i in missing])
+            for i, embedding in zip(missing, computed):
+                embeddings[i] = embedding
+                self.query_cache.put_embedding(queries[i], embedding)
+        return embeddings
+
+    def is_confident_lexical(self, lexical_hits: List[Dict]) -> bool:
+        """Whether the best lexical hit is good enough to skip semantic search:
+        (almost) every query term matched and it clearly beats the runner-up"""
+        if not lexical_hits or lexical_hits[0]['coverage'] < self.lexical_min_coverage:
+            return False
+        if len(lexical_hits) == 1:
+            return True
+        return lexical_hits[0]['lexical_score'] >= self.lexical_margin * lexical_hits[1]['lexical_score']
+
+    def fuse(self, semantic_hits: List[Dict], lexical_hits: List[Dict]) -> List[Dict]:
+        """Combine semantic similarity and max-normalized BM25 scores, best first"""
+        top_lexical = lexical_hits[0]['lexical_score'] if lexical_hits else 0.0
+        # Lexical-only candidates have no semantic score, assume the weakest semantic one
+        floor = min((hit['score'] for hit in semantic_hits), default=0.0)
+        candidates = {hit['id']: dict(hit, lexical_score=0.0) for hit in semantic_hits}
+        for hit in lexical_hits:
+            if hit['id'] in candidates:
+                candidates[hit['id']]['lexical_score'] = hit['lexical_score']
+            else:
+                candidates[hit['id']] = dict(hit, distance=None, score=floor, similarity=None)
+        for hit in candidates.values():
+            lexical_score = hit['lexical_score'] / top_lexical if top_lexical else 0.0
+            hit['score'] = self.hybrid_alpha * hit['score'] + (1 - self.hybrid_alpha) * lexical_score
+        return sorted(candidates.values(), key=lambda hit: hit['score'], reverse=True)
+
+    def search_hits(self, queries: List[str], n_results: int = 3) -> List[List[Dict]]:
+        """Top ``n_results`` hits for every query, served from the cache where possible.
+
+        With hybrid retrieval every query is first looked up in the BM25 index. Queries
+        with a confident lexical hit are answered from it directly; the others are
+        embedded in one model forward pass, searched with the retrieval backend in one
+        query and re-ranked with their lexical scores.
+        """
+        hits: List[Optional[List[Dict]]] = [self.query_cache.get_results(query, n_results) for query in queries]
+        missing = [i for i, query_hits in enumerate(hits) if query_hits is None]
+        lexical: Dict[int, List[Dict]] = {}
+        semantic = []
+        for i in missing:
+            if self.lexical_index is not None:
+                lexical[i] = self.lexical_index.search(queries[i], max(n_results, self.hybrid_candidates))
+                if self.is_confident_lexical(lexical[i]):
+                    hits[i] = [
+                        dict(hit, distance=None, score=hit['coverage'], similarity=None) for hit in lexical[i][:n_results]
+                    ]
+                    continue
+            semantic.append(i)
+        if semantic:
+            k = max(n_results, self.hybrid_candidates) if self.lexical_index is not None else n_results
+            results = self.get_backend().query(self.embed_queries([queries[i] for i in semantic]), k)
+            for i, semantic_hits in zip(semantic, results):
+                # Ranking scores differ per path, the cosine similarity is kept apart from them
+                semantic_hits = [dict(hit, similarity=hit['score']) for hit in semantic_hits]
+                hits[i] = (self.fuse(semantic_hits, lexical[i]) if i in lexical else semantic_hits)[:n_results]
+        for i in missing:
+            self.query_cache.put_results(queries[i], n_results, hits[i])
+        if missing:
+            self.logger.info(f"Searched {len(missing)} uncached queries, {len(semantic)} needed the embedding model")
+        return hits
+
+    def search_knowledge(self, user_query: str, n_results: int = 3) -> Dict:
+        """Best matching Q&A pair for the query.
+
+        Returns the ``question`` and ``answer`` with the ranking ``score`` (higher is
+        better; BM25 term coverage on the lexical fast path, the fused score with hybrid
+        search, the cosine similarity otherwise), the semantic ``similarity`` (cosine,
+        0..1) and ``distance``. Both are None for matches the embedding model did not
+        score: lexical fast-path and lexical-only hybrid matches.
+        """
         self.logger.info(f"Searching for '{user_query}'")
         start_time = time.time()
-        results = self.collection.query(
-            query_texts=[user_query],
-            n_results=n_results,
-            include=["documents", "metadatas"]
-        )
+        hits = self.search_hits([user_query], n_results)[0]
         self.logger.info(f"Search took {time.time() - start_time:.2f} seconds")
-        self.logger.info(f"Result: '{results['metadatas'][0][0]['answer']}'")
-        return results['metadatas'][0][0]['answer']
+        best = hits[0]
+        self.logger.info(f"Result (score {best['score']:.3f}): '{best['answer']}'")
+        return {
+            "question": best['question'],
+            "answer": best['answer'],
+            "score": best['score'],
+            "similarity": best.get('similarity'),
+            "distance": best['distance'],
+        }
+
+    def search_knowledge_batch(self, queries: List[str], n_results: int = 3) -> List[List[Dict]]:
+        """Search many queries at once.
+
+        Uncached queries are embedded in a single model forward pass and sent to the
+        retrieval backend in a single query. Returns, per query, the top ``n_results``
+        hits with their id, question, answer, distance, score and similarity.
+        """
+        start_time = time.time()
+        hits = self.search_hits(queries, n_results)
+        self.logger.info(f"Batch search of {len(queries)} queries took {time.time() - start_time:.2f} seconds")
+        return hits
+
+
+_knowledge_bases: Dict[Tuple[str, str], ChromaKnowledgeBase] = {}
+# Constructor options each registered knowledge base was created with
+_knowledge_base_options: Dict[Tuple[str, str], Dict] = {}
+_registry_lock = threading.Lock()
+
+
+def get_knowledge_base(csv_file_path: str, db_path: str = "chroma_data",
+                       collection_name: str = "it_knowledge_base", sync: bool = False,
+                       **kb_options) -> ChromaKnowledgeBase:
+    """Return the process-wide knowledge base for a collection, creating it on first use.
+
+    The client, the embedding model and the collection handle are shared by every
+    Streamlit session and thread, so they are only loaded once per process.
+    With ``sync`` the collection is incrementally re-synced from the CSV on first use.
+    ``kb_options`` are passed to the ChromaKnowledgeBase constructor on creation;
+    asking for the same collection with different options raises ValueError.
+    """
+    key = (db_path, collection_name)
+    kb = _knowledge_bases.get(key)
+    if kb is None:
+        with _registry_lock:
+            kb = _knowledge_bases.get(key)
+            if kb is None:
+                kb = ChromaKnowledgeBase(db_path=db_path, collection_name=collection_name, **kb_options)
+                _knowledge_base_options[key] = dict(kb_options)
+                _knowledge_bases[key] = kb
+    if _knowledge_base_options[key] != kb_options:
+        raise ValueError(
+            f"Knowledge base {collection_name} in {db_path} was created with {_knowledge_base_options[key]}, "
+            f"not {kb_options}"
+        )
+    kb.initialize_database(csv_file_path, sync=sync)
+    return kb
+
+
+def warm_knowledge_base(csv_file_path: str, db_path: str = "chroma_data",
+                        collection_name: str = "it_knowledge_base", sync: bool = False,
+                        **kb_options) -> None:
+    """Load the knowledge base in a background thread so the first question doesn't pay for it"""
+    if (db_path, collection_name) in _knowledge_bases:
+        return
+    threading.Thread(
+        target=get_knowledge_base,
+        args=(csv_file_path, db_path, collection_name, sync),
+        kwargs=kb_options,
+        name="kb-warmup",
+        daemon=True,
+    ).start()
+
 
 # Example usage
 if __name__ == "__main__":
@@ -81,7 +402,6 @@ if __name__ == "__main__":
         handlers=[logging.StreamHandler(sys.stdout)]
     )
     
-    kb = ChromaKnowledgeBase()
-    kb.initialize_database(CSV_KNOWLEDGE_BASE_PATH)
+    kb = get_knowledge_base(CSV_KNOWLEDGE_BASE_PATH)
     result = kb.search_knowledge("How do I reset my password?")
-    print(result)
\ No newline at end of file
+    print(f"{result['answer']} (score {result['score']:.3f})")
\ No newline at end of file
@@ -1,15 +1,10 @@
 import streamlit as st
-import numpy as np
-from ticket_db.main import TicketDB
-from chroma.main import ChromaKnowledgeBase
-from telegram_handler.main import TelegramHandler
-import pandas as pd
-from pydantic import BaseModel, Field
-from openai import OpenAI, pydantic_function_tool
-import json
+from ticket_db.main import TicketView
+from chat.client import AgentClient
 import environ
 import logging
 import sys
+import uuid
 
 logging.basicConfig(
     level=logging.INFO,
@@ -23,72 +18,29 @@ st.set_page_config(layout="wide", page_title="EPAM reference", page_icon="🤩")
 env = environ.Env()
 environ.Env.read_env('.env')
 
-def get_answer(question: str) -> str:
-    logger.info(f"Searching knowledge base for question: {question}")
-    kb = ChromaKnowledgeBase()
-    kb.initialize_database(env('CSV_KNOWLEDGE_BASE_PATH'))
-    result = kb.search_knowledge(question)
-    logger.info("Knowledge base search completed")
-    return result
-
-class GetAnswer(BaseModel):
-    question: str = Field(..., description="Helpdesk question to be answered.")
-
-answer_tool = pydantic_function_tool(
-    GetAnswer,
-    name="get_answer",
-    description="Get the answer to the helpdesk question.",
-)
-
-def create_ticket(question: str, level: str, person: str) -> str:
-    logger.info(f"Creating ticket for {person} with level {level}")
-    ticket_db = TicketDB()
-    ticket = {
-        'question': question,
-        'level': level,
-        'person': person,
-        'ticket_name': f"HOOLI-{ticket_db.get_latest_id() + 1}"
-    }
-    ticket_db.add_ticket(ticket)
-    telegram_handler = TelegramHandler()
-    telegram_handler.send_ticket(ticket)
-    logger.info(f"Ticket created successfully: {ticket['ticket_name']}")
-    return ticket
-
-class CreateTicket(BaseModel):
-    question: str = Field(..., description="User question to be answered.")
-    level: str = Field(..., description="Must be LOW, MEDIUM, or HIGH")
-    person: str = Field(..., description="Name of the person asking the question")
-
-create_ticket_tool = pydantic_function_tool(
-    CreateTicket,
-    name="create_ticket",
-    description="Create a ticket for the helpdesk.",
-)
-
-tools = [answer_tool, create_ticket_tool]
-
-messages = [
-    {"role": "developer", "content": """
-    You are a helpful assistant for Hooli helpdesk that answers helpdesk questions. Work as humanly as possible.
-    You have access to the Hooli helpdesk knowledge base.
-    When you are asked a question, you will first search the knowledge base for the answer.
-    For the answer, you will use the `get_answer` tool.
-    After you have answered the question, you will ask the user if they would like to create a ticket.
-    If they would like to create a ticket, you should get the user's name. DO NOT ASK FOR THE NAME IF YOU ALREADY HAVE IT.
-    And you should determine the level of the ticket based on the question. Based on the question, the level should be LOW, MEDIUM, or HIGH.
-    Do not ask the user for the level of the ticket. Just determine it based on the question.
-    Also you should rework the question to make it more concise and clear.
-    After you have all the information, you will use the `create_ticket` tool to create the ticket.
-    Answer the question in a friendly and helpful manner.
-    Irrelevant queries should be ignored. Do not answer them and tell the user that you are not able to answer them.
-    PLEASE DO NOT CALL MORE THAN ONE TOOL AT A TIME.
-    IF THE USER USES CURSES OR ANY OTHER OFFENSIVE LANGUAGE, IGNORE THE MESSAGE AND DO NOT RESPOND.
-    IF THE PROMPT FROM USER HAVE ANY CURSING OR OFFENSIVE LANGUAGE, IGNORE THE MESSAGE AND DO NOT RESPOND.
-    """},
-]
-
-client = OpenAI(api_key=env('OPENAI_API_KEY'))
+# The chat runs in the helpdesk agent service (python -m chat.server), shared by all
+# sessions and app processes. Without AGENT_URL it is served from this process.
+@st.cache_resource
+def get_agent_client():
+    agent_url = env('AGENT_URL', default=None)
+    if not agent_url:
+        from chat.server import start_embedded_server
+        agent_url = start_embedded_server()
+    return AgentClient(agent_url)
+
+def render_ticket_stats(container):
+    stats = get_agent_client().get_stats()
+    with container.container():
+        total_col, rate_col, high_col, medium_col, low_col = st.columns(5)
+        total_col.metric("Tickets", stats['total'])
+        rate_col.metric("Per hour (24h)", f"{stats['tickets_per_hour']:.1f}", delta=stats['tickets_last_hour'], help="Change: tickets in the current hour")
+        high_col.metric("HIGH", stats['by_level'].get('HIGH', 0))
+        medium_col.metric("MEDIUM", stats['by_level'].get('MEDIUM', 0))
+        low_col.metric("LOW", stats['by_level'].get('LOW', 0))
+
+@st.cache_resource
+def get_ticket_view():
+    return TicketView(get_agent_client(), window=env.int('TICKETS_PANEL_ROWS', default=1000))
 
 st.title("Hooli Helpdesk")  
 st.logo("./images/hooli.jpeg", size="large")
@@ -110,26 +62,25 @@ with col2:
     """)
     
     st.header("Opened tickets")
+    stats_container = st.empty()
     tickets_container = st.empty()  # Create a container for tickets that can be updated
+    render_ticket_stats(stats_container)
     
-    # Initial display of tickets
-    db = TicketDB()
-    tickets = db.get_all_tickets()
-    tickets_container.dataframe(tickets)
+    # Initial display of tickets, only tickets created since the last rerun are fetched
+    ticket_view = get_ticket_view()
+    tickets_container.dataframe(ticket_view.refresh())
     st.write("https://t.me/s/gen_ai_capstone_2025")
 
 with col1:
     st.header("Try our new AI chatbot!")
     chat_messages = st.container(height=500)
     
+    if "conversation_id" not in st.session_state:
+        st.session_state.conversation_id = str(uuid.uuid4())
     if "messages" not in st.session_state:
-        st.session_state.messages = messages
+        st.session_state.messages = []
 
     for message in st.session_state.messages:
-        if message["role"] == "developer":
-            continue
-        if message["role"] == "tool":
-            continue
         with chat_messages.chat_message(message["role"]):
             st.markdown(message["content"])
 
@@ -143,87 +94,33 @@ with col1:
         with chat_messages.chat_message("user"):
             st.markdown(prompt)
 
+        turn = {}
+
+        def reply_tokens():
+            """Render the turn's events: stages in the status line, tokens in the chat"""
+            try:
+                for event in get_agent_client().send_message(st.session_state.conversation_id, prompt):
+                    if event["type"] == "stage":
+                        spin_me.update(label=event["label"], state="running")
+                    elif event["type"] == "token":
+                        yield event["text"]
+                    elif event["type"] == "done":
+                        turn.update(event)
+            except Exception as e:
+                # An agent error or a dropped connection ends the stream without a done event
+                logger.error(f"Chat turn failed: {e}")
+
         with chat_messages.chat_message("assistant"):
-            logger.info("Making API call to OpenAI")
-            response = client.chat.completions.create(
-                model="gpt-4o-mini",
-                temperature=0,
-                tools=tools,
-                messages=[
-                    {"role": m["role"], "content": m["content"]}
-                    for m in st.session_state.messages
-                ],
-            )
-            logger.info("Received response from OpenAI")
-            
-            # TODO: Interesting bug with 2 functions called at once. Discuss with team.
-            tool_calls = response.choices[0].message.tool_calls or []
-            
-            if tool_calls:
-                logger.info(f"Processing tool call: {tool_calls[0].function.name}")
-                if tool_calls[0].function.name == "get_answer":
-                    args = json.loads(tool_calls[0].function.arguments)
-                    answer_result = get_answer(args["question"])
-                    temp_messages = [
-                            {"role": m["role"], "content": m["content"]}
-                            for m in st.session_state.messages
-                        ]
-                    
-                    temp_messages.append({
-                        "role": "assistant", 
-                        "content": None, 
-                        "tool_calls": response.choices[0].message.tool_calls
-                        })
-                    temp_messages.append({
-                        "role": "tool", 
-                        "tool_call_id": tool_calls[0].id, 
-                        "name": tool_calls[0].function.name, 
-                        "content": str(answer_result)
-                        })
-                    inside_completion = client.chat.completions.create(
-                        model="gpt-4o-mini",
-                        temperature=0,
-                        tools=tools,
-                        messages=temp_messages,
-                    )
-                    assistant_message = inside_completion.choices[0].message.content
-                    st.markdown(assistant_message)
-                if tool_calls[0].function.name == "create_ticket":
-                    args = json.loads(tool_calls[0].function.arguments)
-                    answer_result = create_ticket(args["question"], args["level"], args["person"])
-                    
-                    # Update tickets display after creating a new ticket
-                    tickets = db.get_all_tickets()
-                    tickets_container.dataframe(tickets)
-                    
-                    temp_messages = [
-                            {"role": m["role"], "content": m["content"]}
-                            for m in st.session_state.messages
-                        ]
-                    
-                    temp_messages.append({
-                        "role": "assistant", 
-                        "content": None, 
-                        "tool_calls": response.choices[0].message.tool_calls
-                        })
-                    temp_messages.append({
-                        "role": "tool", 
-                        "tool_call_id": tool_calls[0].id, 
-                        "name": tool_calls[0].function.name, 
-                        "content": str(answer_result)
-                        })
-                    inside_completion = client.chat.completions.create(
-                        model="gpt-4o-mini",
-                        temperature=0,
-                        tools=tools,
-                        messages=temp_messages,
-                    )
-                    assistant_message = inside_completion.choices[0].message.content
-                    st.markdown(assistant_message)
-            else:
-                assistant_message = response.choices[0].message.content
-                st.markdown(assistant_message)
+            st.write_stream(reply_tokens())
+            if "reply" not in turn:
+                st.error("Sorry, something went wrong while answering. Please try again.")
             
-        st.session_state.messages.append({"role": "assistant", "content": assistant_message})
-        logger.info("Chat interaction completed")
+        if turn.get("tickets"):
+            # Update tickets display after creating a new ticket
+            tickets_container.dataframe(ticket_view.refresh())
+            render_ticket_stats(stats_container)
+
+        if "reply" in turn:
+            st.session_state.messages.append({"role": "assistant", "content": turn["reply"]})
+        logger.info(f"Chat interaction completed: {turn.get('timings')}")
         spin_me.update(label="System is ready", state="complete")
@@ -0,0 +1,211 @@
+from typing import Callable, Dict, List, Optional, Tuple
+import logging
+import random
+import sys
+import threading
+
+from telegram_handler.main import TelegramHandler, get_telegram_handler
+
+
+class NotificationDispatcher:
+    """Delivers the ticket notifications queued in the ``tickets.db`` outbox.
+
+    A background thread claims due notifications, sends them through the
+    ``TelegramHandler`` and marks them as sent. Failed deliveries are retried with
+    exponential backoff and jitter until ``max_attempts`` is reached. Because the
+    outbox lives in the database, notifications still pending when the process
+    stopped are picked up again after a restart.
+
+    Delivery is at least once. The Bot API has no idempotent send, so a message
+    whose send outlasts the claim ``lease`` (or whose dispatcher dies after Telegram
+    accepted it but before it was marked sent) can be claimed and sent again. Keep
+    the lease well above the worst-case ``send_message`` time, retries included.
+    The idempotency key only names the notification in the logs.
+
+    With a ``digest_window`` only tickets of ``immediate_levels`` are sent one by one.
+    The others are collected until the oldest of them has waited ``digest_window``
+    seconds and then sent together as digest messages.
+    """
+
+    def __init__(self, ticket_db, telegram_handler: Optional[TelegramHandler] = None, poll_interval: float = 5.0,
+                 batch_size: int = 20, lease: float = 60.0, max_attempts: int = 8,
+                 base_delay: float = 2.0, max_delay: float = 600.0, digest_window: float = 0.0,
+                 immediate_levels: Tuple[str, ...] = ("HIGH",), digest_levels: Tuple[str, ...] = ("MEDIUM", "LOW"),
+                 digest_max_tickets: int = 500):
+        logging.basicConfig(
+            level=logging.INFO,
+            format='[%(levelname)s - %(asctime)s] %(message)s',
+            handlers=[logging.StreamHandler(sys.stdout)]
+        )
+        self.logger = logging.getLogger()
+        self.ticket_db = ticket_db
+        self._telegram_handler = telegram_handler
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.digest_window = digest_window
+        self.immediate_levels = list(immediate_levels)
+        self.digest_levels = list(digest_levels)
+        self.digest_max_tickets = digest_max_tickets
+        # Seconds until the pending digest is due, shortens the poll sleep
+        self._digest_due_in: Optional[float] = None
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def telegram_handler(self) -> TelegramHandler:
+        # Created on first delivery, the app can start without Telegram settings
+        if self._telegram_handler is None:
+            self._telegram_handler = get_telegram_handler()
+        return self._telegram_handler
+
+    def start(self) -> "NotificationDispatcher":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="notification-dispatcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def wake(self):
+        """Check the outbox now instead of at the next poll, e.g. right after a ticket was created"""
+        self._wake.set()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stopping.set()
+            self._wake.set()
+            self._thread.join()
+            self._thread = None
+
+    def backoff(self, attempts: int) -> float:
+        """Delay before the next attempt: exponential in the attempts made, with full jitter"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempts - 1)))
+
+    def dispatch_pending(self) -> int:
+        """Deliver the due notifications and return how many were sent"""
+        if not self.digest_window:
+            items = self.ticket_db.claim_notifications(self.batch_size, self.lease)
+            return self.deliver_all([([item], self._ticket_sender(item)) for item in items])
+
+        items = self.ticket_db.claim_notifications(self.batch_size, self.lease, levels=self.immediate_levels)
+        sent = self.deliver_all([([item], self._ticket_sender(item)) for item in items])
+        if len(items) > sent:
+            return sent
+        self._digest_due_in = None
+        age = self.ticket_db.pending_notification_age(levels=self.digest_levels)
+        if age is None:
+            return sent
+        if age < self.digest_window:
+            self._digest_due_in = self.digest_window - age
+            return sent
+        items = self.ticket_db.claim_notifications(self.digest_max_tickets, self.lease, levels=self.digest_levels)
+        digests = self.telegram_handler.build_digest_messages(items)
+        self.logger.info(f"Sending {len(items)} tickets as {len(digests)} digest message(s)")
+        return sent + self.deliver_all([(tickets, self._message_sender(text)) for text, tickets in digests])
+
+    def deliver_all(self, deliveries: List[Tuple[List[Dict], Callable[[], Dict]]]) -> int:
+        """Make each ``(outbox items, send)`` delivery in turn and record the outcome.
+
+        A delivery Telegram rejects for good (a 4xx other than 429, e.g. a message it
+        cannot parse) is not retried: a single notification is marked failed at once,
+        a digest is split into single notifications so one bad ticket cannot fail the
+        others. After any other failure the remaining claimed items are handed back
+        untried, Telegram is likely down. Returns the number of items delivered.
+        """
+        return self._deliver_all(deliveries)[0]
+
+    def _deliver_all(self, deliveries: List[Tuple[List[Dict], Callable[[], Dict]]]) -> Tuple[int, bool]:
+        """``deliver_all``, also telling whether it stopped early on a transient failure"""
+        sent = []
+        sent_singly = 0
+        interrupted = False
+        for i, (items, send) in enumerate(deliveries):
+            error, permanent = self.deliver(send)
+            if error is None:
+                sent.extend(item['outbox_id'] for item in items)
+                continue
+            if permanent and len(items) > 1:
+                self.logger.warning(f"Digest of {len(items)} tickets rejected ({error}), sending them one by one")
+                delivered, interrupted = self._deliver_all([([item], self._ticket_sender(item)) for item in items])
+                sent_singly += delivered
+            else:
+                for item in items:
+                    give_up = permanent or item['attempts'] >= self.max_attempts
+                    delay = self.backoff(item['attempts'])
+                    if permanent:
+                        self.logger.error(f"Notification {item['idempotency_key']} rejected by Telegram, not retrying: {error}")
+                    elif give_up:
+                        self.logger.error(f"Giving up on notification {item['idempotency_key']} after {item['attempts']} attempts: {error}")
+                    else:
+                        self.logger.warning(f"Notification {item['idempotency_key']} failed ({error}), retrying in {delay:.1f} seconds")
+                    self.ticket_db.retry_notification(item['outbox_id'], delay, error, give_up=give_up)
+                interrupted = not permanent
+            if interrupted:
+                self.ticket_db.release_notifications([item['outbox_id'] for rest, _ in deliveries[i + 1:] for item in rest])
+                break
+        if sent:
+            self.ticket_db.complete_notifications(sent)
+        return len(sent) + sent_singly, interrupted
+
+    def deliver(self, send: Callable[[], Dict]) -> Tuple[Optional[str], bool]:
+        """Make one Telegram call, return the error (None on success) and whether
+        it is permanent, i.e. retrying the same message cannot succeed"""
+        try:
+            result = send()
+        except Exception as e:
+            return str(e), False
+        if not result.get('ok'):
+            error_code = result.get('error_code') or 0
+            permanent = 400 <= error_code < 500 and error_code != 429
+            return result.get('description', 'Telegram API returned ok=false'), permanent
+        return None, False
+
+    def _ticket_sender(self, item: Dict) -> Callable[[], Dict]:
+        return lambda: self.telegram_handler.send_ticket(item)
+
+    def _message_sender(self, text: str) -> Callable[[], Dict]:
+        return lambda: self.telegram_handler.send_message(text)
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wake.clear()
+            try:
+                if self.dispatch_pending():
+                    continue
+            except Exception as e:
+                self.logger.error(f"Notification dispatch failed: {e}")
+            timeout = self.poll_interval
+            if self._digest_due_in is not None:
+                timeout = min(timeout, self._digest_due_in)
+            self._wake.wait(timeout)
+
+
+_dispatchers: Dict[str, NotificationDispatcher] = {}
+_dispatchers_lock = threading.Lock()
+
+
+def get_notification_dispatcher(db_path: str = "tickets.db", **dispatcher_options) -> NotificationDispatcher:
+    """Return the process-wide running dispatcher of a tickets database, starting it on first use"""
+    dispatcher = _dispatchers.get(db_path)
+    if dispatcher is None:
+        with _dispatchers_lock:
+            dispatcher = _dispatchers.get(db_path)
+            if dispatcher is None:
+                from ticket_db.main import TicketDB
+
+                dispatcher = _dispatchers[db_path] = NotificationDispatcher(TicketDB(db_path), **dispatcher_options).start()
+    return dispatcher
+
+
+if __name__ == "__main__":
+    # Drain the outbox of tickets.db once, e.g. after an outage
+    from ticket_db.main import TicketDB
+
+    ticket_db = TicketDB()
+    dispatcher = NotificationDispatcher(ticket_db)
+    while dispatcher.dispatch_pending():
+        pass
+    print(ticket_db.get_outbox_stats())
@@ -1,14 +1,60 @@
-import requests
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
 import environ
+import html
 import logging
 import sys
+import threading
+import time
 
 env = environ.Env()
 environ.Env.read_env('.env')
 
+# Telegram rejects messages longer than this many UTF-16 code units
+MAX_MESSAGE_LENGTH = 4096
+
+
+def message_length(text: str) -> int:
+    """Length of a message as Telegram counts it"""
+    return len(text.encode('utf-16-le')) // 2
+
+
+class TokenBucket:
+    """Thread-safe token bucket: ``rate`` tokens per second, bursts of up to ``capacity``"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, sleeping until one is available"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
 class TelegramHandler:
-    def __init__(self):
+    """Sends ticket notifications through the Telegram Bot API.
+
+    Requests go through one keep-alive HTTP session with connect/read timeouts and
+    are rate limited to Telegram's limits (about 30 messages per second per bot and
+    20 messages per minute per group or channel). Ticket notifications are not sent
+    from the request path: they are queued in the ``tickets.db`` outbox and delivered
+    by ``telegram_handler.dispatcher.NotificationDispatcher`` through this handler.
+    """
+
+    def __init__(self, base_url: Optional[str] = None, timeout: Tuple[float, float] = (3.05, 10.0),
+                 messages_per_second: float = 30.0, chat_messages_per_minute: float = 20.0,
+                 max_retries: int = 3):
         logging.basicConfig(
             level=logging.INFO,
             format='[%(levelname)s - %(asctime)s] %(message)s',
@@ -17,34 +63,143 @@ class TelegramHandler:
         self.logger = logging.getLogger()
         self.bot_token = env('TELEGRAM_API_TOKEN')
         self.channel_id = env('TELEGRAM_CHAT_ID')
-        self.base_url = f"https://api.telegram.org/bot{self.bot_token}"
-        
+        api_url = base_url or env('TELEGRAM_API_URL', default='https://api.telegram.org')
+        self.base_url = f"{api_url.rstrip('/')}/bot{self.bot_token}"
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.global_bucket = TokenBucket(messages_per_second, messages_per_second)
+        self.chat_bucket = TokenBucket(chat_messages_per_minute / 60, chat_messages_per_minute)
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self):
+        """Keep-alive HTTP session, created on first use"""
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
 
+                    session = requests.Session()
+                    session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+                    session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+                    self._session = session
+        return self._session
 
+    # Messages are sent with parse_mode HTML, so every ticket field is escaped:
+    # a stray "<" or "&" would make Telegram reject the whole message
     def format_ticket_message(self, ticket: Dict[str, Any]) -> str:
         return (
             f"🎫 New Ticket\n\n"
-            f"🔗 Ticket Name: {ticket['ticket_name']}\n"
-            f"👤 From: {ticket['person']}\n"
-            f"🔍 Level: {ticket['level']}\n"
-            f"❓ Question: {ticket['question']}"
+            f"🔗 Ticket Name: {html.escape(str(ticket['ticket_name']))}\n"
+            f"👤 From: {html.escape(str(ticket['person']))}\n"
+            f"🔍 Level: {html.escape(str(ticket['level']))}\n"
+            f"❓ Question: {html.escape(str(ticket['question']))}"
         )
 
+    def format_digest_entry(self, ticket: Dict[str, Any]) -> str:
+        return (
+            f"🔗 {html.escape(str(ticket['ticket_name']))} · 🔍 {html.escape(str(ticket['level']))} · "
+            f"👤 {html.escape(str(ticket['person']))}\n"
+            f"❓ {html.escape(str(ticket['question']))}"
+        )
+
+    def build_digest_messages(self, tickets: List[Dict[str, Any]],
+                              max_length: int = MAX_MESSAGE_LENGTH) -> List[Tuple[str, List[Dict[str, Any]]]]:
+        """Coalesce tickets into as few digest messages as fit Telegram's length limit.
+
+        Returns ``(text, tickets in it)`` pairs, so each part can be acknowledged on
+        its own. Questions too long for one message are shortened.
+        """
+        if not tickets:
+            return []
+        # Room for the part header, e.g. "🗂 Ticket digest: 1000 new tickets (part 10/10)"
+        budget = max_length - 64
+        parts: List[List[Tuple[str, Dict[str, Any]]]] = [[]]
+        length = 0
+        for ticket in tickets:
+            entry = self.format_digest_entry(ticket)
+            if message_length(entry) > budget:
+                entry = self._shortened_digest_entry(ticket, budget)
+            entry_length = message_length(entry) + 2
+            if parts[-1] and length + entry_length > budget:
+                parts.append([])
+                length = 0
+            parts[-1].append((entry, ticket))
+            length += entry_length
+        messages = []
+        for number, part in enumerate(parts, start=1):
+            header = f"🗂 Ticket digest: {len(part)} new ticket{'s' if len(part) != 1 else ''}"
+            if len(parts) > 1:
+                header += f" (part {number}/{len(parts)})"
+            text = header + "\n\n" + "\n\n".join(entry for entry, _ in part)
+            messages.append((text, [ticket for _, ticket in part]))
+        return messages
+
+    def _shortened_digest_entry(self, ticket: Dict[str, Any], budget: int) -> str:
+        """The digest entry with the longest prefix of the question that fits ``budget``.
+        The question is cut before escaping, cutting the entry could split an entity."""
+        question = str(ticket['question'])
+        low, high = 0, len(question)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if message_length(self.format_digest_entry(dict(ticket, question=question[:middle] + "…"))) <= budget:
+                low = middle
+            else:
+                high = middle - 1
+        return self.format_digest_entry(dict(ticket, question=question[:low] + "…"))
+
     def send_message(self, text: str) -> Dict[str, Any]:
+        import requests
+
         endpoint = f"{self.base_url}/sendMessage"
         payload = {
             "chat_id": self.channel_id,
             "text": text,
             "parse_mode": "HTML"
         }
-        response = requests.post(endpoint, json=payload)
-        return response.json()
+        for attempt in range(self.max_retries + 1):
+            self.chat_bucket.acquire()
+            self.global_bucket.acquire()
+            try:
+                response = self.session.post(endpoint, json=payload, timeout=self.timeout)
+            except requests.RequestException as e:
+                if attempt == self.max_retries:
+                    raise
+                self.logger.warning(f"Telegram request failed ({e}), retrying")
+                time.sleep(2 ** attempt)
+                continue
+            result = response.json()
+            if response.status_code == 429 and attempt < self.max_retries:
+                # Telegram tells how long to back off when a limit is hit anyway
+                retry_after = result.get("parameters", {}).get("retry_after", 2 ** attempt)
+                self.logger.warning(f"Telegram rate limit hit, retrying in {retry_after} seconds")
+                time.sleep(retry_after)
+                continue
+            return result
+        return result
 
     def send_ticket(self, ticket: Dict[str, Any]) -> Dict[str, Any]:
         message = self.format_ticket_message(ticket)
         self.logger.info(f"Sending ticket message: {message}")
         return self.send_message(message)
 
+
+_handler: Optional[TelegramHandler] = None
+_handler_lock = threading.Lock()
+
+
+def get_telegram_handler() -> TelegramHandler:
+    """Process-wide handler, so every session shares the HTTP session and the rate limits"""
+    global _handler
+    if _handler is None:
+        with _handler_lock:
+            if _handler is None:
+                _handler = TelegramHandler()
+    return _handler
+
+
 if __name__ == "__main__":
     telegram_handler = TelegramHandler()
     ticket = {
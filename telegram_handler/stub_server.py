@@ -0,0 +1,116 @@
+"""Local stand-in for the Telegram Bot API, for testing TelegramHandler offline.
+
+Records every ``sendMessage`` call and can add latency or answer with 429 to
+exercise timeouts and rate-limit handling. Like Telegram, it answers 400 to
+``parse_mode`` HTML messages with unescaped markup. Point the handler at it with
+``TELEGRAM_API_URL=http://127.0.0.1:8081`` or ``TelegramHandler(base_url=...)``.
+
+    python -m telegram_handler.stub_server --port 8081 --latency 0.2
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+import argparse
+import json
+import re
+import threading
+import time
+
+
+_HTML_MARKUP = re.compile(
+    r"</?(b|strong|i|em|u|ins|s|strike|del|span|tg-spoiler|a|code|pre|blockquote)(\s[^<>]*)?>"
+    r"|&(lt|gt|amp|quot|#\d+|#x[0-9a-fA-F]+);"
+)
+
+
+def parses_as_html(text: str) -> bool:
+    """Whether Telegram would accept the text with parse_mode HTML: every "<" and
+    "&" belongs to a supported tag or entity (tag nesting is not checked)"""
+    rest = _HTML_MARKUP.sub("", text)
+    return "<" not in rest and "&" not in rest
+
+
+class TelegramStubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0, rate_limit_every: int = 0):
+        super().__init__((host, port), _StubRequestHandler)
+        self.latency = latency
+        # Answer every n-th request with 429 Too Many Requests, 0 never does
+        self.rate_limit_every = rate_limit_every
+        self.messages: List[Dict[str, Any]] = []
+        self.requests_seen = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "TelegramStubServer":
+        """Serve on a background thread"""
+        self._thread = threading.Thread(target=self.serve_forever, name="telegram-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class _StubRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        server: TelegramStubServer = self.server
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        if server.latency:
+            time.sleep(server.latency)
+
+        with server._lock:
+            server.requests_seen += 1
+            limited = server.rate_limit_every and server.requests_seen % server.rate_limit_every == 0
+            unparsable = payload.get("parse_mode") == "HTML" and not parses_as_html(payload.get("text") or "")
+            if not limited and not unparsable and self.path.endswith("/sendMessage"):
+                server.messages.append(payload)
+                message_id = len(server.messages)
+
+        if limited:
+            self._reply(429, {"ok": False, "error_code": 429, "description": "Too Many Requests: retry after 1",
+                              "parameters": {"retry_after": 1}})
+        elif unparsable:
+            self._reply(400, {"ok": False, "error_code": 400,
+                              "description": "Bad Request: can't parse entities: unsupported start tag"})
+        elif self.path.endswith("/sendMessage"):
+            self._reply(200, {"ok": True, "result": {"message_id": message_id, "chat": {"id": payload.get("chat_id")},
+                                                     "date": int(time.time()), "text": payload.get("text")}})
+        else:
+            self._reply(404, {"ok": False, "error_code": 404, "description": "Not Found"})
+
+    def _reply(self, status: int, body: Dict[str, Any]):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds to wait before answering")
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="answer every n-th request with 429")
+    args = parser.parse_args()
+
+    server = TelegramStubServer(args.host, args.port, args.latency, args.rate_limit_every)
+    print(f"Telegram stub listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
@@ -1,10 +1,160 @@
 import sqlite3
-from typing import List, Dict
+from concurrent.futures import Future
+from typing import List, Dict, Optional
+import atexit
+import datetime
 import logging
+import queue
+import re
 import sys
+import threading
+import time
+
+# Pragmas applied to every connection. WAL lets the "Opened tickets" reads run
+# concurrently with ticket writes; NORMAL sync is durable in WAL mode except on power loss.
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-8000",
+)
+
+# Words left out of full-text duplicate lookups
+FTS_STOPWORDS = {
+    "a", "an", "and", "are", "can", "do", "does", "for", "how", "i", "in", "is", "it", "me",
+    "my", "of", "on", "or", "the", "to", "what", "when", "why", "with",
+}
+
+# One connection per thread and database file, shared by all TicketDB instances
+_local = threading.local()
+# Database files whose schema has already been set up by this process
+_initialized_paths = set()
+_schema_lock = threading.Lock()
+
+
+def get_connection(db_path: str) -> sqlite3.Connection:
+    """Return the calling thread's connection to the database, opening it on first use"""
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    conn = connections.get(db_path)
+    if conn is None:
+        conn = sqlite3.connect(db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        connections[db_path] = conn
+    return conn
+
+
+class TicketWriter:
+    """Background writer that group-commits queued ticket inserts.
+
+    Tickets submitted from any thread are collected for up to ``flush_interval``
+    seconds or ``max_batch`` tickets and inserted with one ``executemany`` in a
+    single transaction. Every caller gets its stored ticket back through a future.
+    With the default interval of 0 a group is whatever queued up while the previous
+    one was being committed, which suits callers that wait for their ticket; a few
+    milliseconds give larger groups for fire-and-forget submitters.
+    """
+
+    def __init__(self, db_path: str, flush_interval: float = 0.0, max_batch: int = 100):
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.logger = logging.getLogger()
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=f"ticket-writer-{db_path}", daemon=True)
+        self._thread.start()
+
+    def submit(self, ticket_data: Dict) -> Future:
+        future: Future = Future()
+        self._queue.put((ticket_data, future))
+        return future
+
+    def stop(self):
+        """Flush the queued tickets and stop the writer thread"""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _next_batch(self) -> List[tuple]:
+        item = self._queue.get()
+        if item is None:
+            return []
+        batch = [item]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.max_batch:
+            # Take everything already queued, then wait for more until the deadline
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+            if item is None:
+                # Requeue the stop marker so the loop ends after this batch
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        ticket_db = None
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                break
+            if ticket_db is None:
+                # Opened on first use by this thread; if it fails, fail this group and
+                # retry with the next one instead of leaving every future waiting
+                try:
+                    ticket_db = TicketDB(self.db_path)
+                except Exception as e:
+                    self.logger.error(f"Ticket writer could not open {self.db_path}: {e}")
+                    for _, future in batch:
+                        future.set_exception(e)
+                    continue
+            try:
+                stored = ticket_db.add_tickets([ticket_data for ticket_data, _ in batch])
+            except sqlite3.IntegrityError:
+                # One invalid ticket must not fail the whole group, insert them one by one
+                for ticket_data, future in batch:
+                    try:
+                        future.set_result(ticket_db.add_tickets([ticket_data])[0])
+                    except Exception as e:
+                        future.set_exception(e)
+                continue
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), ticket in zip(batch, stored):
+                future.set_result(ticket)
+
+
+_writers: Dict[str, TicketWriter] = {}
+_writers_lock = threading.Lock()
+
+
+def get_writer(db_path: str, **writer_options) -> TicketWriter:
+    """Return the process-wide background writer of a database file, starting it on first use"""
+    writer = _writers.get(db_path)
+    if writer is None:
+        with _writers_lock:
+            writer = _writers.get(db_path)
+            if writer is None:
+                writer = _writers[db_path] = TicketWriter(db_path, **writer_options)
+                atexit.register(writer.stop)
+    return writer
+
 
 class TicketDB:
-    def __init__(self, db_path: str = "tickets.db"):
+    def __init__(self, db_path: str = "tickets.db", write_behind: bool = False):
         logging.basicConfig(
             level=logging.INFO,
             format='[%(levelname)s - %(asctime)s] %(message)s',
@@ -13,14 +163,28 @@ class TicketDB:
         self.logger = logging.getLogger()
         
         self.db_path = db_path
-        self.create_table()
+        # Route single inserts through the group-committing background writer
+        self.write_behind = write_behind
+        if db_path not in _initialized_paths:
+            with _schema_lock:
+                if db_path not in _initialized_paths:
+                    self.create_table()
+                    _initialized_paths.add(db_path)
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        return get_connection(self.db_path)
 
+    def close(self):
+        """Close the calling thread's connection, a new one is opened on next use"""
+        conn = getattr(_local, "connections", {}).pop(self.db_path, None)
+        if conn is not None:
+            conn.close()
 
     def create_table(self):
         """Create tickets table if it doesn't exist"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
+        with self.connection as conn:
+            conn.execute('''
                 CREATE TABLE IF NOT EXISTS tickets (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     ticket_name TEXT,
@@ -29,42 +193,442 @@ class TicketDB:
                     person TEXT
                 )
             ''')
-            conn.commit()
-
-    def add_ticket(self, ticket_data: Dict) -> int:
-        """Add a new ticket to the database"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            self.logger.info(f"Adding ticket: {ticket_data}")
-            cursor.execute('''
-                INSERT INTO tickets (ticket_name, question, level, person)
-                VALUES (?, ?, ?, ?)
+            # Ticket names are derived from the generated id inside the insert transaction
+            conn.execute('''
+                CREATE TRIGGER IF NOT EXISTS tickets_assign_name
+                AFTER INSERT ON tickets
+                WHEN NEW.ticket_name IS NULL
+                BEGIN
+                    UPDATE tickets SET ticket_name = 'HOOLI-' || NEW.id WHERE id = NEW.id;
+                END
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_tickets_level ON tickets(level)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_tickets_person ON tickets(person)')
+            self.create_fts_index(conn)
+            self.create_stats_tables(conn)
+            self.create_outbox_table(conn)
+        try:
+            with self.connection as conn:
+                conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_tickets_ticket_name ON tickets(ticket_name)')
+        except sqlite3.IntegrityError:
+            self.logger.warning("Duplicate ticket names found in existing tickets, ticket_name is not enforced unique")
+
+    def create_fts_index(self, conn: sqlite3.Connection):
+        """FTS5 index over the ticket questions, kept in sync with the tickets table by triggers"""
+        exists = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'tickets_fts'").fetchone()
+        conn.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS tickets_fts
+            USING fts5(question, content='tickets', content_rowid='id', tokenize='porter unicode61')
+        ''')
+        conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS tickets_fts_insert AFTER INSERT ON tickets BEGIN
+                INSERT INTO tickets_fts(rowid, question) VALUES (NEW.id, NEW.question);
+            END
+        ''')
+        conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS tickets_fts_delete AFTER DELETE ON tickets BEGIN
+                INSERT INTO tickets_fts(tickets_fts, rowid, question) VALUES ('delete', OLD.id, OLD.question);
+            END
+        ''')
+        conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS tickets_fts_update AFTER UPDATE OF question ON tickets BEGIN
+                INSERT INTO tickets_fts(tickets_fts, rowid, question) VALUES ('delete', OLD.id, OLD.question);
+                INSERT INTO tickets_fts(rowid, question) VALUES (NEW.id, NEW.question);
+            END
+        ''')
+        if not exists:
+            # Index the tickets created before the index existed
+            conn.execute("INSERT INTO tickets_fts(tickets_fts) VALUES ('rebuild')")
+
+    def create_stats_tables(self, conn: sqlite3.Connection):
+        """Summary tables maintained by triggers, so statistics never scan the tickets table"""
+        exists = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'ticket_stats'").fetchone()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS ticket_stats (
+                dimension TEXT,
+                key TEXT,
+                count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (dimension, key)
+            ) WITHOUT ROWID
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_ticket_stats_count ON ticket_stats(dimension, count)')
+        # Tickets created per UTC hour
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS ticket_hourly (
+                hour TEXT PRIMARY KEY,
+                count INTEGER NOT NULL DEFAULT 0
+            ) WITHOUT ROWID
+        ''')
+        conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS ticket_stats_insert AFTER INSERT ON tickets BEGIN
+                INSERT INTO ticket_stats(dimension, key, count)
+                VALUES ('total', '', 1), ('level', COALESCE(NEW.level, ''), 1), ('person', COALESCE(NEW.person, ''), 1)
+                ON CONFLICT(dimension, key) DO UPDATE SET count = count + 1;
+                INSERT INTO ticket_hourly(hour, count) VALUES (strftime('%Y-%m-%dT%H', 'now'), 1)
+                ON CONFLICT(hour) DO UPDATE SET count = count + 1;
+            END
+        ''')
+        conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS ticket_stats_delete AFTER DELETE ON tickets BEGIN
+                UPDATE ticket_stats SET count = count - 1
+                WHERE (dimension, key) IN (VALUES ('total', ''), ('level', COALESCE(OLD.level, '')), ('person', COALESCE(OLD.person, '')));
+            END
+        ''')
+        conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS ticket_stats_update AFTER UPDATE OF level, person ON tickets BEGIN
+                UPDATE ticket_stats SET count = count - 1
+                WHERE (dimension, key) IN (VALUES ('level', COALESCE(OLD.level, '')), ('person', COALESCE(OLD.person, '')));
+                INSERT INTO ticket_stats(dimension, key, count)
+                VALUES ('level', COALESCE(NEW.level, ''), 1), ('person', COALESCE(NEW.person, ''), 1)
+                ON CONFLICT(dimension, key) DO UPDATE SET count = count + 1;
+            END
+        ''')
+        if not exists:
+            # Count the tickets created before the summary tables existed
+            conn.execute('''
+                INSERT INTO ticket_stats(dimension, key, count)
+                SELECT 'total', '', COUNT(*) FROM tickets
+                UNION ALL SELECT 'level', COALESCE(level, ''), COUNT(*) FROM tickets GROUP BY COALESCE(level, '')
+                UNION ALL SELECT 'person', COALESCE(person, ''), COUNT(*) FROM tickets GROUP BY COALESCE(person, '')
+            ''')
+
+    def create_outbox_table(self, conn: sqlite3.Connection):
+        """Transactional outbox of ticket notifications.
+
+        A trigger adds a pending notification in the same transaction as every ticket
+        insert, so a committed ticket always has one and a rolled back one never does.
+        The idempotency key is unique per ticket, a notification is enqueued only once
+        (it is delivered at least once, see ``claim_notifications``).
+        ``queued_at`` and ``next_attempt_at`` are epoch seconds.
+        """
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS notification_outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                idempotency_key TEXT NOT NULL UNIQUE,
+                ticket_id INTEGER NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending' CHECK(status IN ('pending', 'sent', 'failed')),
+                attempts INTEGER NOT NULL DEFAULT 0,
+                queued_at REAL NOT NULL DEFAULT ((julianday('now') - 2440587.5) * 86400.0),
+                next_attempt_at REAL NOT NULL DEFAULT ((julianday('now') - 2440587.5) * 86400.0),
+                last_error TEXT,
+                created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                sent_at TEXT
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_outbox_due ON notification_outbox(status, next_attempt_at)')
+        conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS tickets_enqueue_notification AFTER INSERT ON tickets BEGIN
+                INSERT OR IGNORE INTO notification_outbox(idempotency_key, ticket_id, queued_at)
+                VALUES ('ticket-' || NEW.id, NEW.id, (julianday('now') - 2440587.5) * 86400.0);
+            END
+        ''')
+
+    def add_ticket(self, ticket_data: Dict) -> Dict:
+        """Add a new ticket and return it as stored, including its generated id and name.
+
+        The insert and the name assignment run in one write transaction on one
+        connection, so concurrent sessions can never get the same ticket name.
+        A ``ticket_name`` in ``ticket_data`` is ignored. In write-behind mode the
+        ticket is group-committed with other queued tickets by the background writer.
+        """
+        if self.write_behind:
+            return self.submit_ticket(ticket_data).result()
+        self.logger.info(f"Adding ticket: {ticket_data}")
+        with self.connection as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            ticket_id = conn.execute('''
+                INSERT INTO tickets (question, level, person)
+                VALUES (?, ?, ?)
+                RETURNING id
             ''', (
-                f"HOOLI-{self.get_latest_id() + 1}",
                 ticket_data['question'],
                 ticket_data['level'],
                 ticket_data['person']
-            ))
-            conn.commit()
-            return cursor.lastrowid
+            )).fetchone()[0]
+            ticket = dict(conn.execute('SELECT * FROM tickets WHERE id = ?', (ticket_id,)).fetchone())
+        self.logger.info(f"Added ticket {ticket['ticket_name']}")
+        return ticket
+
+    def submit_ticket(self, ticket_data: Dict) -> Future:
+        """Queue a ticket for the background writer.
+
+        The returned future resolves to the stored ticket once its group is committed.
+        Without write-behind the ticket is inserted right away.
+        """
+        if not self.write_behind:
+            future: Future = Future()
+            future.set_result(self.add_ticket(ticket_data))
+            return future
+        return get_writer(self.db_path).submit(ticket_data)
+
+    def add_tickets(self, tickets: List[Dict]) -> List[Dict]:
+        """Insert many tickets with one executemany in a single transaction and return
+        them as stored, in order"""
+        if not tickets:
+            return []
+        with self.connection as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            # Ids are handed out in increasing order while this transaction holds the write lock
+            last_id = conn.execute(
+                "SELECT COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'tickets'), 0)"
+            ).fetchone()[0]
+            conn.executemany(
+                'INSERT INTO tickets (question, level, person) VALUES (?, ?, ?)',
+                [(ticket['question'], ticket['level'], ticket['person']) for ticket in tickets]
+            )
+            stored = [dict(row) for row in conn.execute('SELECT * FROM tickets WHERE id > ? ORDER BY id', (last_id,))]
+        self.logger.info(f"Added {len(stored)} tickets: {stored[0]['ticket_name']}..{stored[-1]['ticket_name']}")
+        return stored
         
+    def claim_notifications(self, limit: int = 20, lease: float = 60.0, levels: Optional[List[str]] = None) -> List[Dict]:
+        """Claim up to ``limit`` due notifications for delivery, oldest first.
+
+        Claiming counts an attempt and hides the notifications from other dispatchers
+        (in this or another process) for ``lease`` seconds. A dispatcher that dies
+        mid-delivery leaves them to be claimed again once the lease runs out, so
+        delivery is at least once. ``levels`` restricts the claim to tickets of these
+        levels. Each item is the ticket plus ``outbox_id``, ``idempotency_key`` and
+        ``attempts``.
+        """
+        now = time.time()
+        level_filter, params = self._level_filter(levels)
+        with self.connection as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            claimed = conn.execute(f'''
+                UPDATE notification_outbox SET attempts = attempts + 1, next_attempt_at = ?
+                WHERE id IN (
+                    SELECT notification_outbox.id FROM notification_outbox
+                    JOIN tickets ON tickets.id = notification_outbox.ticket_id
+                    WHERE status = 'pending' AND next_attempt_at <= ? {level_filter}
+                    ORDER BY notification_outbox.id LIMIT ?
+                )
+                RETURNING id
+            ''', (now + lease, now, *params, limit)).fetchall()
+            if not claimed:
+                return []
+            placeholders = ','.join('?' * len(claimed))
+            rows = conn.execute(f'''
+                SELECT tickets.*, notification_outbox.id AS outbox_id, notification_outbox.idempotency_key,
+                       notification_outbox.attempts
+                FROM notification_outbox JOIN tickets ON tickets.id = notification_outbox.ticket_id
+                WHERE notification_outbox.id IN ({placeholders})
+                ORDER BY notification_outbox.id
+            ''', [row['id'] for row in claimed]).fetchall()
+        return [dict(row) for row in rows]
+
+    def pending_notification_age(self, levels: Optional[List[str]] = None) -> Optional[float]:
+        """Seconds the longest waiting due notification (of tickets of ``levels``) has
+        been waiting, None when there is none. A retried notification waits from the
+        time its retry became due, not from when it was first queued."""
+        now = time.time()
+        level_filter, params = self._level_filter(levels)
+        waiting_since = self.connection.execute(f'''
+            SELECT MIN(MAX(notification_outbox.queued_at, notification_outbox.next_attempt_at))
+            FROM notification_outbox JOIN tickets ON tickets.id = notification_outbox.ticket_id
+            WHERE status = 'pending' AND next_attempt_at <= ? {level_filter}
+        ''', (now, *params)).fetchone()[0]
+        return None if waiting_since is None else now - waiting_since
+
+    @staticmethod
+    def _level_filter(levels: Optional[List[str]]) -> tuple:
+        if levels is None:
+            return '', ()
+        return f"AND tickets.level IN ({','.join('?' * len(levels))})", tuple(levels)
+
+    def complete_notifications(self, outbox_ids: List[int]):
+        """Mark notifications as delivered"""
+        with self.connection as conn:
+            conn.executemany(
+                "UPDATE notification_outbox SET status = 'sent', sent_at = CURRENT_TIMESTAMP, last_error = NULL WHERE id = ?",
+                [(outbox_id,) for outbox_id in outbox_ids]
+            )
+
+    def retry_notification(self, outbox_id: int, delay: float, error: str, give_up: bool = False):
+        """Schedule another delivery attempt in ``delay`` seconds, or mark the
+        notification as failed for good"""
+        with self.connection as conn:
+            conn.execute(
+                'UPDATE notification_outbox SET status = ?, next_attempt_at = ?, last_error = ? WHERE id = ?',
+                ('failed' if give_up else 'pending', time.time() + delay, error, outbox_id)
+            )
+
+    def release_notifications(self, outbox_ids: List[int]):
+        """Hand claimed but unattempted notifications back, without counting an attempt"""
+        with self.connection as conn:
+            conn.executemany(
+                'UPDATE notification_outbox SET attempts = attempts - 1, next_attempt_at = ? WHERE id = ?',
+                [(time.time(), outbox_id) for outbox_id in outbox_ids]
+            )
+
+    def get_outbox_stats(self) -> Dict[str, int]:
+        """Number of notifications per status"""
+        cursor = self.connection.execute('SELECT status, COUNT(*) AS count FROM notification_outbox GROUP BY status')
+        return {row['status']: row['count'] for row in cursor}
+
     def get_latest_id(self) -> int:
         """Get the latest ticket ID from the database"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute('SELECT MAX(id) FROM tickets')
-            result = cursor.fetchone()[0]
-            self.logger.info(f"Latest ticket ID: {result}")
-            return result if result is not None else 0
+        cursor = self.connection.execute('SELECT MAX(id) FROM tickets')
+        result = cursor.fetchone()[0]
+        self.logger.info(f"Latest ticket ID: {result}")
+        return result if result is not None else 0
+
+
+    @staticmethod
+    def _words(text: str) -> set:
+        """Lowercased words without stopwords, as the FTS5 porter tokenizer expects them"""
+        return {word for word in re.findall(r"\w+", text.lower()) if word not in FTS_STOPWORDS}
 
+    @classmethod
+    def _terms(cls, text: str) -> set:
+        """Words without common suffixes ("connecting" -> "connect"), compared for similarity"""
+        terms = set()
+        for term in cls._words(text):
+            for suffix in ("ions", "ion", "ing", "ed", "es", "s"):
+                if term.endswith(suffix) and len(term) - len(suffix) >= 3:
+                    term = term[:-len(suffix)]
+                    break
+            terms.add(term)
+        return terms
+
+    def find_similar_tickets(self, question: str, person: Optional[str] = None, limit: int = 5,
+                             min_similarity: float = 0.0) -> List[Dict]:
+        """Find existing tickets whose question resembles ``question``, best match first.
+
+        Candidates come from the FTS5 index ranked by bm25, so the lookup stays an
+        index search as the table grows. Each returned ticket carries ``similarity``,
+        the word overlap (Jaccard) between the two questions, and tickets below
+        ``min_similarity`` are dropped. All stored tickets count as open.
+        """
+        words = self._words(question)
+        if not words:
+            return []
+        # Unstemmed words, porter stems them like the indexed text
+        match = " OR ".join(f'"{word}"' for word in sorted(words))
+        terms = self._terms(question)
+        sql = '''
+            SELECT tickets.* FROM tickets_fts
+            JOIN tickets ON tickets.id = tickets_fts.rowid
+            WHERE tickets_fts MATCH ?
+        '''
+        params: list = [match]
+        if person is not None:
+            sql += ' AND tickets.person = ?'
+            params.append(person)
+        sql += ' ORDER BY tickets_fts.rank LIMIT ?'
+        params.append(limit)
+        similar = []
+        for row in self.connection.execute(sql, params):
+            ticket = dict(row)
+            candidate_terms = self._terms(ticket['question'] or '')
+            ticket['similarity'] = len(terms & candidate_terms) / len(terms | candidate_terms)
+            if ticket['similarity'] >= min_similarity:
+                similar.append(ticket)
+        return similar
+
+    def get_stats(self, top_persons: int = 10, rate_window_hours: int = 24) -> Dict:
+        """Ticket statistics read from the trigger-maintained summary tables.
+
+        Returns the ``total`` count, counts ``by_level``, the ``top_persons`` people
+        with the most tickets (``by_person``), the tickets created in the current UTC
+        hour (``tickets_last_hour``) and the average ``tickets_per_hour`` over the last
+        ``rate_window_hours`` hours. The cost does not depend on the number of tickets.
+        """
+        conn = self.connection
+        total = conn.execute("SELECT count FROM ticket_stats WHERE dimension = 'total'").fetchone()
+        by_level = {
+            row['key']: row['count']
+            for row in conn.execute("SELECT key, count FROM ticket_stats WHERE dimension = 'level' AND count > 0")
+        }
+        by_person = {
+            row['key']: row['count']
+            for row in conn.execute(
+                "SELECT key, count FROM ticket_stats WHERE dimension = 'person' AND count > 0 ORDER BY count DESC LIMIT ?",
+                (top_persons,)
+            )
+        }
+        now = datetime.datetime.now(datetime.timezone.utc)
+        since = (now - datetime.timedelta(hours=rate_window_hours - 1)).strftime('%Y-%m-%dT%H')
+        hourly = {
+            row['hour']: row['count']
+            for row in conn.execute('SELECT hour, count FROM ticket_hourly WHERE hour >= ?', (since,))
+        }
+        return {
+            'total': total['count'] if total else 0,
+            'by_level': by_level,
+            'by_person': by_person,
+            'tickets_last_hour': hourly.get(now.strftime('%Y-%m-%dT%H'), 0),
+            'tickets_per_hour': sum(hourly.values()) / rate_window_hours,
+        }
 
     def get_all_tickets(self) -> List[Dict]:
         """Retrieve all tickets from the database"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            cursor.execute('SELECT * FROM tickets')
-            return [dict(row) for row in cursor.fetchall()]
+        cursor = self.connection.execute('SELECT * FROM tickets')
+        return [dict(row) for row in cursor.fetchall()]
+
+    def get_tickets_page(self, before_id: Optional[int] = None, limit: int = 50,
+                         level: Optional[str] = None, person: Optional[str] = None) -> List[Dict]:
+        """Retrieve one page of tickets, newest first.
+
+        Keyset pagination: pass the smallest id of the previous page as ``before_id``
+        to get the next one. Every page is an index range scan, however deep it is.
+        """
+        conditions, params = [], []
+        if before_id is not None:
+            conditions.append('id < ?')
+            params.append(before_id)
+        if level is not None:
+            conditions.append('level = ?')
+            params.append(level)
+        if person is not None:
+            conditions.append('person = ?')
+            params.append(person)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        cursor = self.connection.execute(f'SELECT * FROM tickets {where} ORDER BY id DESC LIMIT ?', (*params, limit))
+        return [dict(row) for row in cursor.fetchall()]
+
+    def get_tickets_since(self, last_id: int, limit: Optional[int] = None) -> List[Dict]:
+        """Retrieve the tickets created after ``last_id``, oldest first"""
+        cursor = self.connection.execute(
+            'SELECT * FROM tickets WHERE id > ? ORDER BY id LIMIT ?', (last_id, limit if limit is not None else -1)
+        )
+        return [dict(row) for row in cursor.fetchall()]
+
+
+class TicketView:
+    """Columnar cache of the most recent tickets for the "Opened tickets" panel.
+
+    The first refresh loads the latest ``window`` tickets; later refreshes only fetch
+    tickets newer than the last one seen and append them, dropping the oldest rows
+    beyond the window. Safe to share between sessions. Any source with
+    ``get_tickets_page`` and ``get_tickets_since`` works in place of the ``TicketDB``,
+    e.g. the agent API client.
+    """
+
+    COLUMNS = ('id', 'ticket_name', 'question', 'level', 'person')
+
+    def __init__(self, ticket_db: TicketDB, window: int = 1000):
+        self.ticket_db = ticket_db
+        self.window = window
+        self.last_id: Optional[int] = None
+        self.columns: Dict[str, List] = {column: [] for column in self.COLUMNS}
+        self._lock = threading.Lock()
+
+    def refresh(self) -> Dict[str, List]:
+        """Pick up new tickets and return the cached columns"""
+        with self._lock:
+            if self.last_id is None:
+                rows = list(reversed(self.ticket_db.get_tickets_page(limit=self.window)))
+            else:
+                rows = self.ticket_db.get_tickets_since(self.last_id)
+            if rows:
+                columns = {column: values + [row[column] for row in rows] for column, values in self.columns.items()}
+                if len(columns['id']) > self.window:
+                    columns = {column: values[-self.window:] for column, values in columns.items()}
+                self.columns = columns
+                self.last_id = rows[-1]['id']
+            elif self.last_id is None:
+                self.last_id = 0
+            return self.columns
 
 # Example usage:
 if __name__ == "__main__":
@@ -76,12 +640,11 @@ if __name__ == "__main__":
         'question': 'Need help with printer setup',
         'level': 'MEDIUM',
         'person': 'John Doe',
-        'ticket_name': f"HOOLI-{db.get_latest_id() + 1}"
     }
 
     # Add a ticket
-    ticket_id = db.add_ticket(sample_ticket)
-    print(f"Added ticket with ID: {ticket_id}")
+    ticket = db.add_ticket(sample_ticket)
+    print(f"Added ticket {ticket['ticket_name']} with ID: {ticket['id']}")
 
     # Get all tickets
     all_tickets = db.get_all_tickets()